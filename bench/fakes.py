@@ -0,0 +1,166 @@
+"""Local stand-ins for every service the bot talks to.
+
+Each upstream gets its own port so per-host rate limiting behaves as in
+production. The servers run on a background thread with their own event
+loop, so serving fixtures doesn't compete with the bot for the loop it is
+being measured on.
+"""
+
+import json
+import time
+import asyncio
+import threading
+from collections import Counter
+from aiohttp import web
+from .fixtures import map_data, map_metadata, market, BUBBLE_PAGE
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "BubbleSnitch", "username": "bubblesnitch_bench_bot"}
+ERROR_MARKERS = ("error occurred", "failed to", "⚠️ failed")
+
+class FakeUpstreams:
+    def __init__(self, tokens, nodes: int, links: int, upstream_latency: float = 0.0, telegram_latency: float = 0.0):
+        self.upstream_latency = upstream_latency
+        self.telegram_latency = telegram_latency
+        # Serialise fixtures up front so requests only cost a dict lookup
+        self.maps = {(c, a.lower()): json.dumps(map_data(c, a, nodes, links)).encode() for c, a in tokens}
+        self.metadata = {(c, a.lower()): map_metadata(c, a) for c, a in tokens}
+        self.markets = {a.lower(): market(a) for _, a in tokens}
+        self.requests = Counter()
+        self.errors = Counter()  # chat_id -> replies that reported a failure
+        self.last_keyboard = {}  # chat_id -> last message carrying callback buttons
+        self.photo_bytes = 0
+        self.urls = {}
+        self._message_ids = 0
+        self._runners = []
+        self._loop = None
+        self._thread = None
+
+    # Bubblemaps legacy API
+
+    async def _map_data(self, request):
+        self.requests["bubblemaps /map-data"] += 1
+        await asyncio.sleep(self.upstream_latency)
+        body = self.maps.get((request.query.get("chain"), request.query.get("token", "").lower()))
+        if body is None:
+            return web.Response(status=404)
+        return web.Response(body=body, content_type="application/json")
+
+    async def _map_metadata(self, request):
+        self.requests["bubblemaps /map-metadata"] += 1
+        await asyncio.sleep(self.upstream_latency)
+        meta = self.metadata.get((request.query.get("chain"), request.query.get("token", "").lower()))
+        if meta is None:
+            return web.Response(status=404)
+        return web.json_response(meta)
+
+    # CoinGecko
+
+    async def _token_price(self, request):
+        self.requests["coingecko /simple/token_price"] += 1
+        await asyncio.sleep(self.upstream_latency)
+        addresses = request.query.get("contract_addresses", "").lower().split(",")
+        return web.json_response({a: self.markets[a] for a in addresses if a in self.markets})
+
+    # Bubblemaps web app
+
+    async def _bubble_page(self, request):
+        self.requests["app /token page"] += 1
+        await asyncio.sleep(self.upstream_latency)
+        return web.Response(text=BUBBLE_PAGE, content_type="text/html")
+
+    # Telegram Bot API
+
+    async def _telegram(self, request):
+        method = request.match_info["method"]
+        form = await request.post()
+        self.requests[f"telegram {method}"] += 1
+        await asyncio.sleep(self.telegram_latency)
+        if method == "getMe":
+            result = BOT_USER
+        elif method.startswith(("send", "edit")) and "chat_id" in form:
+            result = self._message(form)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def _message(self, form) -> dict:
+        self._message_ids += 1
+        chat_id = int(form["chat_id"])
+        message = {
+            "message_id": self._message_ids,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+        }
+        text = form.get("text") or form.get("caption") or ""
+        if text:
+            message["caption" if "caption" in form else "text"] = text
+        if any(marker in text.lower() for marker in ERROR_MARKERS):
+            self.errors[chat_id] += 1
+
+        photo = form.get("photo")
+        if photo is not None:
+            if isinstance(photo, web.FileField):
+                size = len(photo.file.read())
+                self.photo_bytes += size
+                file_id = f"bench-photo-{self._message_ids}"
+            else:
+                size, file_id = 0, photo
+            message["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 1280, "height": 720, "file_size": size}]
+
+        if form.get("reply_markup"):
+            markup = json.loads(form["reply_markup"])
+            message["reply_markup"] = markup
+            if any("callback_data" in b for row in markup.get("inline_keyboard", []) for b in row):
+                self.last_keyboard[chat_id] = message
+        return message
+
+    # Lifecycle
+
+    def _apps(self) -> dict:
+        bubblemaps = web.Application()
+        bubblemaps.router.add_get("/map-data", self._map_data)
+        bubblemaps.router.add_get("/map-metadata", self._map_metadata)
+        coingecko = web.Application()
+        coingecko.router.add_get("/api/v3/simple/token_price/{platform}", self._token_price)
+        app_page = web.Application()
+        app_page.router.add_get("/{chain}/token/{address}", self._bubble_page)
+        telegram = web.Application(client_max_size=50 * 1024 * 1024)
+        telegram.router.add_route("*", "/{bot}/{method}", self._telegram)
+        return {
+            "bubblemaps": (bubblemaps, ""),
+            "coingecko": (coingecko, "/api/v3"),
+            "app": (app_page, ""),
+            "telegram": (telegram, ""),
+        }
+
+    async def _serve(self):
+        for name, (app, prefix) in self._apps().items():
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", 0).start()
+            self._runners.append(runner)
+            host, port = runner.addresses[0][:2]
+            self.urls[name] = f"http://{host}:{port}{prefix}"
+
+    def _run(self, ready: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+        ready.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(asyncio.gather(*(r.cleanup() for r in self._runners)))
+        self._loop.close()
+
+    def start(self) -> dict:
+        """Start every server; returns their base URLs by name."""
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="bench-fakes", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.urls
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
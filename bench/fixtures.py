@@ -0,0 +1,103 @@
+"""Deterministic fixture data for the benchmark's fake upstreams."""
+
+import random
+import hashlib
+
+CHAINS = ("eth", "bsc")
+
+def _rng(*parts) -> random.Random:
+    return random.Random(hashlib.sha256(":".join(map(str, parts)).encode()).digest())
+
+def _evm_address(rng: random.Random) -> str:
+    return "0x" + "".join(rng.choice("0123456789abcdef") for _ in range(40))
+
+def token_addresses(count: int, seed: int = 0) -> list[tuple[str, str]]:
+    rng = _rng("tokens", seed)
+    return [(CHAINS[i % len(CHAINS)], _evm_address(rng)) for i in range(count)]
+
+def map_data(chain: str, address: str, nodes: int, links: int) -> dict:
+    """Bubblemaps /map-data payload with ``nodes`` holders and ``links`` transfers."""
+    rng = _rng("map", chain, address)
+    # Zipf-like holder distribution, scaled to 90% of supply
+    weights = [1 / (i + 1) ** 1.1 for i in range(nodes)]
+    scale = 90 / sum(weights) if weights else 0
+    holders = [
+        {
+            "address": _evm_address(rng),
+            "amount": w * scale * 1e7,
+            "is_contract": rng.random() < 0.1,
+            "name": f"holder {i}",
+            "percentage": w * scale,
+            "transaction_count": rng.randint(1, 500),
+            "transfer_X721_count": None,
+            "transfer_count": rng.randint(1, 200),
+        }
+        for i, w in enumerate(weights)
+    ]
+    transfers = [
+        {
+            "source": rng.randrange(nodes),
+            "target": rng.randrange(nodes),
+            "forward": rng.random() * 1e5,
+            "backward": rng.random() * 1e3,
+        }
+        for _ in range(links if nodes else 0)
+    ]
+    return {
+        "version": 4,
+        "chain": chain,
+        "token_address": address,
+        "dt_update": "2024-01-01 00:00:00",
+        "full_name": f"Bench Token {address[2:8]}",
+        "symbol": address[2:6].upper(),
+        "is_X721": False,
+        "metadata": {"max_amount": 1e7, "min_amount": 0},
+        "nodes": holders,
+        "links": transfers,
+        "token_links": [
+            {"address": _evm_address(rng), "name": f"Related {i}", "symbol": f"REL{i}"}
+            for i in range(5)
+        ],
+    }
+
+def map_metadata(chain: str, address: str) -> dict:
+    rng = _rng("meta", chain, address)
+    return {
+        "status": "OK",
+        "decentralisation_score": round(rng.uniform(20, 95), 1),
+        "identified_supply": {
+            "percent_in_cexs": round(rng.uniform(0, 40), 2),
+            "percent_in_contracts": round(rng.uniform(0, 30), 2),
+        },
+        "dt_update": "2024-01-01 00:00:00",
+        "ts_update": 1704067200,
+    }
+
+def market(address: str) -> dict:
+    rng = _rng("market", address.lower())
+    return {
+        "usd": round(rng.uniform(0.001, 50), 6),
+        "usd_market_cap": round(rng.uniform(1e6, 5e9), 2),
+        "usd_24h_vol": round(rng.uniform(1e4, 5e7), 2),
+    }
+
+BUBBLE_PAGE = """<!doctype html>
+<html><head><title>Bubblemaps</title></head>
+<body style="margin:0">
+<div class="mdc-dialog"><div class="mdc-dialog_actions">
+  <button data-mdc-dialog-action="discard"><div>close</div></button>
+</div></div>
+<canvas id="map" width="1280" height="720"></canvas>
+<script>
+setTimeout(() => {
+  const ctx = document.getElementById("map").getContext("2d");
+  for (let i = 0; i < 200; i++) {
+    ctx.beginPath();
+    ctx.arc(Math.random() * 1280, Math.random() * 720, 4 + Math.random() * 30, 0, 2 * Math.PI);
+    ctx.fillStyle = `hsl(${i * 37 % 360}, 70%, 60%)`;
+    ctx.fill();
+  }
+}, 300);
+</script>
+</body></html>
+"""
@@ -0,0 +1,245 @@
+"""Offline load test for the bot.
+
+Starts local stand-ins for the Bubblemaps API, CoinGecko, the Bubblemaps
+web app and the Telegram Bot API, points the real application at them and
+drives synthetic users through scans, inline button presses and /trending.
+Updates go through the same update processor as in production, so the
+reported latencies include per-chat ordering and concurrency limits.
+
+    python -m bench.run --users 20 --duration 30 --nodes 500
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import itertools
+from collections import Counter, defaultdict
+from telegram import Update
+from .fakes import FakeUpstreams
+from .fixtures import token_addresses
+
+BENCH_TOKEN = "123456:bench"
+SETUP_CHAT = 999_999_999
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench.run", description=__doc__.split("\n\n")[0])
+    p.add_argument("--users", type=int, default=20, help="concurrent synthetic users (one chat each)")
+    p.add_argument("--duration", type=float, default=30, help="measured seconds")
+    p.add_argument("--warmup", type=float, default=5, help="seconds of unmeasured load first, 0 for cold caches")
+    p.add_argument("--tokens", type=int, default=50, help="distinct tokens users scan")
+    p.add_argument("--nodes", type=int, default=500, help="holders per token map")
+    p.add_argument("--links", type=int, default=1000, help="transfers per token map")
+    p.add_argument("--favorites", type=int, default=10, help="tokens favorited before the run, feeding /trending")
+    p.add_argument("--clicks", type=int, default=2, help="inline buttons pressed after each scan")
+    p.add_argument("--trending-ratio", type=float, default=0.3, help="chance of a /trending after each scan")
+    p.add_argument("--think", type=float, default=0.0, help="mean think time between scans, seconds")
+    p.add_argument("--upstream-latency", type=float, default=20, help="added latency of fake APIs, ms")
+    p.add_argument("--telegram-latency", type=float, default=30, help="added latency of the fake Bot API, ms")
+    p.add_argument("--render", choices=("native", "browser", "auto"), default="native",
+                   help="RENDER_MODE for the run; browser modes need Playwright's Chromium")
+    p.add_argument("--unlimited", action="store_true", help="lift the upstream rate limits")
+    p.add_argument("--trace", action="store_true", help="print the per-scan trace records")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    return p.parse_args(argv)
+
+def configure_env(args, urls: dict, workdir: str):
+    # Must run before the bot is imported: its modules read settings at import time
+    os.environ.pop("WEBHOOK_URL", None)
+    os.environ.update({
+        "TELEGRAM_TOKEN": BENCH_TOKEN,
+        "TELEGRAM_API_URL": urls["telegram"],
+        "BUBBLEMAPS_API_URL": urls["bubblemaps"],
+        "COINGECKO_API_URL": urls["coingecko"],
+        "BUBBLEMAPS_APP_URL": urls["app"],
+        "RENDER_MODE": args.render,
+        "PORT": "0",
+        "DB_PATH": os.path.join(workdir, "bench.db"),
+        "RENDER_CACHE_DIR": os.path.join(workdir, "renders"),
+        "PROFILE_DIR": os.path.join(workdir, "profiles"),
+        "TRACE_SCANS": "1" if args.trace else "0",
+    })
+    if args.unlimited:
+        for name in ("BUBBLEMAPS", "COINGECKO"):
+            os.environ[f"{name}_RATE"] = "1000000"
+            os.environ[f"{name}_BURST"] = "1000000"
+
+def percentile(values: list, p: float) -> float:
+    # Nearest-rank on an already sorted list
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))]
+
+class Driver:
+    def __init__(self, app, fakes: FakeUpstreams, args, tokens):
+        self.app = app
+        self.fakes = fakes
+        self.args = args
+        self.tokens = tokens
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def _user(self, uid: int) -> dict:
+        return {"id": uid, "is_bot": False, "first_name": f"user{uid}"}
+
+    def message(self, uid: int, text: str) -> dict:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": uid, "type": "private"},
+            "from": self._user(uid),
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": next(self._update_ids), "message": message}
+
+    def callback(self, uid: int, message: dict, data: str) -> dict:
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(uid),
+                "chat_instance": str(uid),
+                "message": message,
+                "data": data,
+            },
+        }
+
+    async def send(self, action: str, uid: int, payload: dict):
+        update = Update.de_json(payload, self.app.bot)
+        # Same step the polling/webhook paths take for arbitrary callback data
+        self.app.bot.insert_callback_data(update)
+        errors_before = self.fakes.errors[uid]
+        start = time.perf_counter()
+        try:
+            await self.app.update_processor.process_update(update, self.app.process_update(update))
+        except Exception:
+            self.errors[action] += 1
+        else:
+            if self.fakes.errors[uid] > errors_before:
+                self.errors[action] += 1
+        self.latencies[action].append(time.perf_counter() - start)
+
+    async def setup(self):
+        from core.trending import TRENDING
+        for chain, address in self.tokens[:self.args.favorites]:
+            await self.send("setup", SETUP_CHAT, self.message(SETUP_CHAT, f"/addfavorite {chain} {address}"))
+        await TRENDING.refresh()
+
+    async def user(self, uid: int, deadline: float):
+        rng = random.Random(self.args.seed * 1_000_003 + uid)
+        while time.monotonic() < deadline:
+            chain, address = rng.choice(self.tokens)
+            await self.send("scan", uid, self.message(uid, f"{chain} {address}"))
+
+            shown = self.fakes.last_keyboard.get(uid)
+            buttons = [
+                b for row in (shown or {}).get("reply_markup", {}).get("inline_keyboard", [])
+                for b in row if "callback_data" in b and b["text"] != "Cancel"
+            ]
+            for _ in range(self.args.clicks if buttons else 0):
+                button = rng.choice(buttons)
+                action = "button:" + button["text"].lower().replace(" ", "_")
+                await self.send(action, uid, self.callback(uid, shown, button["callback_data"]))
+
+            if rng.random() < self.args.trending_ratio:
+                await self.send("trending", uid, self.message(uid, "/trending"))
+            if self.args.think:
+                await asyncio.sleep(rng.expovariate(1 / self.args.think))
+
+    async def run(self, seconds: float) -> float:
+        start = time.monotonic()
+        deadline = start + seconds
+        await asyncio.gather(*(self.user(uid, deadline) for uid in range(1, self.args.users + 1)))
+        return time.monotonic() - start
+
+def report(args, driver: Driver, fakes: FakeUpstreams, elapsed: float) -> dict:
+    rows = {}
+    everything = []
+    for action in sorted(driver.latencies, key=lambda a: (a != "scan", a)):
+        values = sorted(driver.latencies[action])
+        everything.extend(values)
+        rows[action] = values
+    rows["all"] = sorted(everything)
+
+    results = {"config": vars(args), "elapsed": elapsed, "actions": {}}
+    print(
+        f"\n{args.users} users, {elapsed:.1f}s, {args.tokens} tokens "
+        f"({args.nodes} nodes / {args.links} links), render={args.render}\n"
+    )
+    print(f"{'action':<24}{'count':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for action, values in rows.items():
+        errors = sum(driver.errors.values()) if action == "all" else driver.errors[action]
+        stats = {
+            "count": len(values),
+            "errors": errors,
+            "rps": len(values) / elapsed if elapsed else 0.0,
+            "p50": percentile(values, 50) * 1000,
+            "p95": percentile(values, 95) * 1000,
+            "p99": percentile(values, 99) * 1000,
+            "max": (values[-1] if values else 0.0) * 1000,
+        }
+        results["actions"][action] = stats
+        print(
+            f"{action:<24}{stats['count']:>7}{errors:>8}{stats['rps']:>9.2f}"
+            f"{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}{stats['max']:>10.1f}"
+        )
+
+    results["upstream_requests"] = dict(sorted(fakes.requests.items()))
+    results["photo_bytes"] = fakes.photo_bytes
+    print("\nUpstream requests:")
+    for name, count in results["upstream_requests"].items():
+        print(f"  {name:<32}{count:>8}")
+    print(f"  {'photo bytes uploaded':<32}{fakes.photo_bytes:>8}")
+    return results
+
+async def main(args):
+    tokens = token_addresses(args.tokens, args.seed)
+    print(f"Building fixtures for {len(tokens)} tokens…")
+    fakes = FakeUpstreams(tokens, args.nodes, args.links, args.upstream_latency / 1000, args.telegram_latency / 1000)
+    urls = fakes.start()
+    workdir = tempfile.mkdtemp(prefix="bubblesnitch-bench-")
+    configure_env(args, urls, workdir)
+
+    import bot  # reads the environment configured above
+
+    app = bot.build_app()
+    await app.initialize()
+    await bot.post_init(app)
+    await app.start()
+    try:
+        driver = Driver(app, fakes, args, tokens)
+        await driver.setup()
+        if args.warmup:
+            print(f"Warming up for {args.warmup:.0f}s…")
+            await driver.run(args.warmup)
+            driver.latencies.clear()
+            driver.errors.clear()
+            fakes.requests.clear()
+            fakes.photo_bytes = 0
+        print(f"Measuring for {args.duration:.0f}s…")
+        elapsed = await driver.run(args.duration)
+        results = report(args, driver, fakes, elapsed)
+    finally:
+        await app.stop()
+        await bot.post_shutdown(app)
+        await app.shutdown()
+        fakes.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args(sys.argv[1:])))
@@ -1,10 +1,21 @@
 import os
+import signal
 import datetime
 import asyncio
 from dotenv import load_dotenv
+from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 from core.cache import cleanup_cache
+from core.render_cache import cleanup_render_cache, RENDER_CACHE_TTL
+from core.api_clients import init_http, shutdown_http
+from core.workers import init_workers, shutdown_workers
+from core.storage import init_storage, shutdown_storage
+from core.extra import init_stats
+from core.trending import refresh_trending, TRENDING_REFRESH
+from core.alerts import init_alerts, alert_tick, ALERT_TICK
 from core.playwright_sceenshot import init_browser, shutdown_browser
+from core.updates import ChatOrderedUpdateProcessor
+from dummy_server import start_http_server, stop_http_server, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET
 from handlers.commands import start_cmd, help_cmd, add_favorite, list_favorites, remove_favorite, trending, stats
 from handlers.tutorial import tutorial_start, tutorial_callback, register_tutorial
 from handlers.typos_and_messages import handle_contract_address, handle_typos
@@ -15,17 +26,59 @@ TOKEN = os.getenv("TELEGRAM_TOKEN")
 if not TOKEN:
     raise RuntimeError("Set TELEGRAM_TOKEN in .env")
 print(f" Loaded token: {TOKEN[:4]}…{TOKEN[-4:]}")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "").rstrip("/")
 
-def main():
-    app = (
+async def post_init(app):
+    await init_workers(app)
+    await init_storage(app)
+    await init_stats(app)
+    await init_alerts(app)
+    await init_http(app)
+    await init_browser(app)
+    await start_http_server(app)
+
+async def post_shutdown(app):
+    await stop_http_server(app)
+    await shutdown_browser(app)
+    await shutdown_http(app)
+    await shutdown_workers(app)
+    await shutdown_storage(app)
+
+async def run_webhook(app):
+    # Telegram pushes updates to the HTTP server on PORT; run_webhook() would need
+    # its own port, so the application lifecycle is driven by hand here
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with app:
+        await post_init(app)
+        await app.start()
+        await app.bot.set_webhook(
+            url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 40)),
+        )
+        print(f"Bot is running (webhook {WEBHOOK_URL})…")
+        await stop.wait()
+        await app.stop()
+        await post_shutdown(app)
+
+def build_app() -> Application:
+    builder = (
         Application.builder()
         .token(TOKEN)
-        .post_init(init_browser)
-        .post_shutdown(shutdown_browser)
-        .concurrent_updates(False)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .concurrent_updates(ChatOrderedUpdateProcessor())
         .arbitrary_callback_data(True)
-        .build()
     )
+    if TELEGRAM_API_URL:
+        # Self-hosted Bot API server (or the benchmark's stand-in)
+        builder.base_url(f"{TELEGRAM_API_URL}/bot").base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+    app = builder.build()
 
     # Core commands
     app.add_handler(CommandHandler("start", start_cmd))
@@ -53,14 +106,18 @@ def main():
 
     # Scheduled cache cleanup
     app.job_queue.run_repeating(cleanup_cache, interval=int(os.getenv("CACHE_EXPIRY", 300)))
+    app.job_queue.run_repeating(cleanup_render_cache, interval=RENDER_CACHE_TTL)
+    app.job_queue.run_repeating(refresh_trending, interval=TRENDING_REFRESH, first=5)
+    app.job_queue.run_repeating(alert_tick, interval=ALERT_TICK, first=ALERT_TICK)
+    return app
 
-    print("Bot is running…")
-    app.run_polling()
-
-import threading
-from dummy_server import run_dummy_server
+def main():
+    app = build_app()
+    if WEBHOOK_URL:
+        asyncio.run(run_webhook(app))
+    else:
+        print("Bot is running…")
+        app.run_polling()
 
-# Start the dummy server in a new thread
-threading.Thread(target=run_dummy_server, daemon=True).start()
 if __name__ == "__main__":
     main()
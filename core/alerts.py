@@ -0,0 +1,161 @@
+import os
+import zlib
+import asyncio
+from telegram.error import TelegramError
+from telegram.ext import ContextTypes
+from .api_clients import fetch_meta, fetch_market
+from .analysis import fetch_analysis
+from .ratelimit import background_priority
+from .storage import STORAGE
+
+ALERT_TICK = int(os.getenv("ALERT_TICK", 60))
+ALERT_SHARDS = int(os.getenv("ALERT_SHARDS", 5))
+ALERT_CONCURRENCY = int(os.getenv("ALERT_CONCURRENCY", 8))
+# Thresholds: relative change in %, or absolute change in points
+ALERT_PRICE_PCT = float(os.getenv("ALERT_PRICE_PCT", 10))
+ALERT_VOLUME_PCT = float(os.getenv("ALERT_VOLUME_PCT", 50))
+ALERT_SCORE_POINTS = float(os.getenv("ALERT_SCORE_POINTS", 5))
+ALERT_HOLDER_POINTS = float(os.getenv("ALERT_HOLDER_POINTS", 2))
+ALERT_TOP_HOLDERS = 5
+
+def _shard(token: tuple[str, str]) -> int:
+    return zlib.crc32(f"{token[0]}:{token[1]}".encode()) % ALERT_SHARDS
+
+def _pct_change(old, new):
+    try:
+        old, new = float(old), float(new)
+    except (TypeError, ValueError):
+        return None
+    return (new - old) / old * 100 if old else None
+
+class AlertEngine:
+    """Watches every distinct favorited token and messages its subscribers on big moves.
+
+    Each token lives in one of ALERT_SHARDS shards and is polled once per
+    full rotation, however many users follow it.
+    """
+
+    def __init__(self):
+        self.subscribers: dict[tuple[str, str], set[int]] = {}
+        self.snapshots: dict[tuple[str, str], dict] = {}
+        self._shards: list[set] = [set() for _ in range(ALERT_SHARDS)]
+        self._tick = 0
+        self._sem = asyncio.Semaphore(ALERT_CONCURRENCY)
+
+    def subscribe(self, user_id: int, chain: str, address: str):
+        token = (chain, address)
+        self.subscribers.setdefault(token, set()).add(user_id)
+        self._shards[_shard(token)].add(token)
+
+    def unsubscribe(self, user_id: int, chain: str, address: str):
+        token = (chain, address)
+        users = self.subscribers.get(token)
+        if users is None:
+            return
+        users.discard(user_id)
+        if not users:
+            del self.subscribers[token]
+            self.snapshots.pop(token, None)
+            self._shards[_shard(token)].discard(token)
+
+    async def load(self):
+        for user_id, chain, address in await STORAGE.load_subscriptions():
+            self.subscribe(user_id, chain, address)
+
+    async def tick(self, bot):
+        shard = self._shards[self._tick % ALERT_SHARDS]
+        self._tick += 1
+        await asyncio.gather(*(self._check(bot, token) for token in list(shard)))
+
+    async def _snapshot(self, chain, address):
+        with background_priority():
+            market, meta, analysis = await asyncio.gather(
+                fetch_market(chain, address), fetch_meta(chain, address), fetch_analysis(chain, address),
+            )
+        # Only the sources that answered; a failed fetch must not read as everything
+        # dropping to zero, so its fields keep their last good values
+        fresh = {}
+        if market is not None:
+            fresh.update(price=market.get("price"), vol=market.get("vol"))
+        if meta is not None:
+            fresh["score"] = meta.get("score")
+        if analysis is not None:
+            holders = dict(zip(analysis.addresses, analysis.percentages.tolist()))
+            fresh.update(
+                # Every listed holder, so a wallet entering or leaving the top is diffed against
+                # its real share; the map omits wallets below its smallest listed holder
+                holders=holders,
+                floor=min(holders.values(), default=0.0),
+                top=[h["address"] for h in analysis.holders(ALERT_TOP_HOLDERS)],
+            )
+        return fresh
+
+    async def _check(self, bot, token):
+        async with self._sem:
+            try:
+                fresh = await self._snapshot(*token)
+                old = self.snapshots.get(token)
+                new = {**(old or {}), **fresh}
+                self.snapshots[token] = new
+                changes = self.diff(old, new) if old else []
+            except Exception as e:
+                # One bad token must not abort the tick for the rest of the shard
+                print(f"⚠️ Alert poll failed for {token}: {e!r}")
+                return
+            if changes:
+                await self._notify(bot, token, changes)
+
+    @staticmethod
+    def diff(old: dict, new: dict) -> list[str]:
+        changes = []
+        price = _pct_change(old.get("price"), new.get("price"))
+        if price is not None and abs(price) >= ALERT_PRICE_PCT:
+            changes.append(f"Price {price:+.1f}% (${new['price']})")
+        vol = _pct_change(old.get("vol"), new.get("vol"))
+        if vol is not None and abs(vol) >= ALERT_VOLUME_PCT:
+            changes.append(f"Volume {vol:+.1f}% (${new['vol']})")
+        if old.get("score") is not None and new.get("score") is not None:
+            moved = float(new["score"]) - float(old["score"])
+            if abs(moved) >= ALERT_SCORE_POINTS:
+                changes.append(f"Decentralization score {old['score']} → {new['score']}")
+        if "holders" not in old:
+            # No map yet to compare against
+            return changes
+        for addr in dict.fromkeys(old["top"] + new["top"]):
+            short = f"{addr[:6]}...{addr[-4:]}"
+            was, now = old["holders"].get(addr), new["holders"].get(addr)
+            if was is not None and now is not None:
+                if abs(now - was) >= ALERT_HOLDER_POINTS:
+                    changes.append(f"Holder {short} {now - was:+.2f} pts ({now:.2f}%)")
+            elif now is not None:
+                # Not listed before: it held at most the old map's smallest share
+                if now - old["floor"] >= ALERT_HOLDER_POINTS:
+                    changes.append(f"New top holder {short} ({now:.2f}%)")
+            elif was is not None:
+                # No longer listed: it holds at most the new map's smallest share
+                if was - new["floor"] >= ALERT_HOLDER_POINTS:
+                    changes.append(f"Holder {short} left the map (was {was:.2f}%)")
+        return changes
+
+    async def _notify(self, bot, token, changes):
+        chain, address = token
+        url = f"https://app.bubblemaps.io/{chain}/token/{address}"
+        text = (
+            f"🚨 **Big move on {chain.upper()} {address[:6]}...{address[-4:]}** 🚨\n\n"
+            + "\n".join(f"• {c}" for c in changes)
+            + f"\n\n[View Map]({url})"
+        )
+        for user_id in list(self.subscribers.get(token, ())):
+            try:
+                await bot.send_message(chat_id=user_id, text=text, parse_mode="Markdown")
+            except TelegramError as e:
+                print(f"⚠️ Alert to {user_id} failed: {e}")
+
+ALERTS = AlertEngine()
+
+async def init_alerts(app):
+    await ALERTS.load()
+    print(f"✅ Alerts watching {len(ALERTS.subscribers)} tokens")
+
+async def alert_tick(context: ContextTypes.DEFAULT_TYPE):
+    await ALERTS.tick(context.bot)
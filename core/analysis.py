@@ -0,0 +1,85 @@
+import sys
+import numpy as np
+from .cache import simple_cache
+from .api_clients import fetch_bubble
+
+TOP_K = 10
+
+class TokenAnalysis:
+    """Array-backed view of one map-data payload, parsed once and shared by all handlers.
+
+    Holder and transfer rankings are precomputed with partial selection, so
+    handlers only format results.
+    """
+
+    __slots__ = (
+        "addresses", "percentages", "is_contract",
+        "link_src", "link_dst", "link_amount",
+        "holder_count", "link_count",
+        "top_holder_idx", "top_transfer_idx",
+        "contract_share", "top10_share",
+    )
+
+    def __init__(self, bubble: dict, top_k: int = TOP_K):
+        nodes = bubble.get("nodes") or []
+        links = bubble.get("links") or []
+        n = len(nodes)
+
+        self.addresses = [node.get("address", "Unknown") for node in nodes]
+        self.percentages = np.fromiter((float(node.get("percentage") or 0) for node in nodes), np.float64, n)
+        self.is_contract = np.fromiter((bool(node.get("is_contract")) for node in nodes), bool, n)
+
+        # Endpoints that aren't valid node indices are stored as -1
+        def endpoint(i):
+            return i if isinstance(i, int) and 0 <= i < n else -1
+        self.link_src = np.fromiter((endpoint(l.get("source")) for l in links), np.int64, len(links))
+        self.link_dst = np.fromiter((endpoint(l.get("target")) for l in links), np.int64, len(links))
+        self.link_amount = np.fromiter(
+            (max(float(l.get("forward", 0)), float(l.get("backward", 0))) for l in links), np.float64, len(links)
+        )
+
+        self.holder_count = n
+        self.link_count = len(links)
+        self.top_holder_idx = _top_k(self.percentages, top_k)
+        self.top_transfer_idx = _top_k(self.link_amount, top_k)
+        self.contract_share = float(self.percentages[self.is_contract].sum())
+        self.top10_share = float(self.percentages[self.top_holder_idx[:10]].sum())
+
+    def __sizeof__(self):
+        arrays = (self.percentages, self.is_contract, self.link_src, self.link_dst, self.link_amount,
+                  self.top_holder_idx, self.top_transfer_idx)
+        return (object.__sizeof__(self) + sum(a.nbytes for a in arrays)
+                + sys.getsizeof(self.addresses) + sum(sys.getsizeof(a) for a in self.addresses))
+
+    def holders(self, k: int) -> list[dict]:
+        return [
+            {"address": self.addresses[i], "percentage": float(self.percentages[i]),
+             "is_contract": bool(self.is_contract[i])}
+            for i in self.top_holder_idx[:k]
+        ]
+
+    def transfers(self, k: int) -> list[tuple]:
+        # (source address, target address, amount); addresses are None for malformed links
+        out = []
+        for j in self.top_transfer_idx[:k]:
+            src, dst = self.link_src[j], self.link_dst[j]
+            valid = src >= 0 and dst >= 0
+            out.append((
+                self.addresses[src] if valid else None,
+                self.addresses[dst] if valid else None,
+                float(self.link_amount[j]),
+            ))
+        return out
+
+def _top_k(values: np.ndarray, k: int) -> np.ndarray:
+    # Indices of the k largest values, largest first, without a full sort
+    if len(values) > k:
+        idx = np.argpartition(-values, k - 1)[:k]
+    else:
+        idx = np.arange(len(values))
+    return idx[np.argsort(-values[idx], kind="stable")]
+
+@simple_cache()
+async def fetch_analysis(chain, addr):
+    bubble = await fetch_bubble(chain, addr)
+    return TokenAnalysis(bubble) if bubble else None
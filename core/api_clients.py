@@ -1,38 +1,183 @@
+import os
+import time
+import asyncio
 import aiohttp
+from urllib.parse import urlsplit
 from .cache import simple_cache
+from .decoding import read_body, decode_json, project_bubble
+from .ratelimit import limit_host, limiter_for, retry_after, request_priority, REQUEST_PRIORITY
+from .metrics import UPSTREAM_SECONDS, UPSTREAM_REQUESTS
 
-BASE_BUBBLE = "https://api-legacy.bubblemaps.io"
-COINGECKO = "https://api.coingecko.com/api/v3"
+BASE_BUBBLE = os.getenv("BUBBLEMAPS_API_URL", "https://api-legacy.bubblemaps.io").rstrip("/")
+COINGECKO = os.getenv("COINGECKO_API_URL", "https://api.coingecko.com/api/v3").rstrip("/")
 PLATFORMS = {"eth":"ethereum","bsc":"binance-smart-chain","sol":"solana"}
 
+limit_host(BASE_BUBBLE, "BUBBLEMAPS", 5, 10)
+limit_host(COINGECKO, "COINGECKO", 0.5, 5)
+
+# Shared connection pool settings
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 30))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+HTTP_LIMIT = int(os.getenv("HTTP_LIMIT", 100))
+HTTP_LIMIT_PER_HOST = int(os.getenv("HTTP_LIMIT_PER_HOST", 20))
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", 60))
+HTTP_DNS_TTL = int(os.getenv("HTTP_DNS_TTL", 300))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))
+
+# CoinGecko market lookups are batched per platform over this window. The keyless
+# public API takes one contract per call, so only raise the size with an API plan.
+MARKET_BATCH_WINDOW = float(os.getenv("MARKET_BATCH_WINDOW", 0.05))
+MARKET_BATCH_SIZE = int(os.getenv("MARKET_BATCH_SIZE", 1))
+
+_session: aiohttp.ClientSession | None = None
+
+def get_session() -> aiohttp.ClientSession:
+    # Lazily (re)create the pooled session so fetchers also work outside the app lifecycle
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_LIMIT,
+            limit_per_host=HTTP_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE,
+            ttl_dns_cache=HTTP_DNS_TTL,
+            use_dns_cache=True,
+            enable_cleanup_closed=True,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+    return _session
+
+async def init_http(app):
+    app.bot_data["http"] = get_session()
+    print("✅ HTTP session ready")
+
+async def shutdown_http(app):
+    global _session
+    app.bot_data.pop("http", None)
+    if _session and not _session.closed:
+        await _session.close()
+        print("🔒 HTTP session closed")
+    _session = None
+
+async def get_json(url, project=None):
+    # Streams the body and decodes it, off the loop when large; None unless HTTP 200.
+    # Calls wait their turn on the host's rate limiter and back off on HTTP 429.
+    limiter = limiter_for(url)
+    host = urlsplit(url).hostname
+    for attempt in range(HTTP_RETRIES + 1):
+        if limiter:
+            await limiter.acquire()
+        start, status = time.perf_counter(), "error"
+        try:
+            async with get_session().get(url) as r:
+                status = r.status
+                if r.status != 429 or attempt == HTTP_RETRIES:
+                    if r.status!=200: return None
+                    return await decode_json(await read_body(r), project)
+                delay = retry_after(r.headers.get("Retry-After"), attempt)
+        finally:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - start, host=host)
+            UPSTREAM_REQUESTS.inc(host=host, status=status)
+        print(f"⏳ 429 from {r.url.host}, backing off {delay:.1f}s")
+        if limiter:
+            limiter.pause(delay)
+        else:
+            await asyncio.sleep(delay)
+
 @simple_cache()
 async def fetch_bubble(chain, addr):
-    async with aiohttp.ClientSession() as s:
-        async with s.get(f"{BASE_BUBBLE}/map-data?token={addr}&chain={chain}") as r:
-            return await r.json() if r.status==200 else None
+    return await get_json(f"{BASE_BUBBLE}/map-data?token={addr}&chain={chain}", project_bubble)
 
 @simple_cache()
 async def fetch_meta(chain, addr):
-    async with aiohttp.ClientSession() as s:
-        async with s.get(f"{BASE_BUBBLE}/map-metadata?chain={chain}&token={addr}") as r:
-            if r.status!=200: return None
-            d = await r.json()
-            return {
-                "score":d.get("decentralisation_score"),
-                "cex": d["identified_supply"]["percent_in_cexs"],
-                "contract": d["identified_supply"]["percent_in_contracts"],
-            }
+    d = await get_json(f"{BASE_BUBBLE}/map-metadata?chain={chain}&token={addr}")
+    if d is None: return None
+    return {
+        "score":d.get("decentralisation_score"),
+        "cex": d["identified_supply"]["percent_in_cexs"],
+        "contract": d["identified_supply"]["percent_in_contracts"],
+    }
+
+class MarketBatcher:
+    """Collects market lookups for a short window and sends one request per platform.
+
+    Callers await their own future; results of the multi-contract
+    /simple/token_price call are fanned back out by address.
+    """
+
+    def __init__(self, window: float = MARKET_BATCH_WINDOW, max_batch: int = MARKET_BATCH_SIZE):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}  # platform -> {address: [futures]}
+        self._priority = {}
+        self._timers = {}
+
+    async def get(self, plat, addr):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        bucket = self._pending.setdefault(plat, {})
+        bucket.setdefault(addr, []).append(fut)
+        # The batch goes out at the priority of its most urgent caller
+        self._priority[plat] = min(self._priority.get(plat, REQUEST_PRIORITY.get()), REQUEST_PRIORITY.get())
+        if len(bucket) >= self.max_batch:
+            self._flush(plat)
+        elif plat not in self._timers:
+            self._timers[plat] = loop.call_later(self.window, self._flush, plat)
+        return await fut
+
+    def _flush(self, plat):
+        timer = self._timers.pop(plat, None)
+        if timer:
+            timer.cancel()
+        bucket = self._pending.pop(plat, None)
+        priority = self._priority.pop(plat, None)
+        if bucket:
+            asyncio.ensure_future(self._send(plat, bucket, priority))
+
+    async def _request(self, plat, addrs):
+        return await get_json(
+            f"{COINGECKO}/simple/token_price/{plat}?contract_addresses={','.join(addrs)}"
+            "&vs_currencies=usd&include_market_cap=true&include_24hr_vol=true"
+        )
+
+    async def _send(self, plat, bucket, priority):
+        # Every future in the bucket is resolved on every path, or its callers hang
+        try:
+            with request_priority(priority):
+                d = await self._request(plat, list(bucket))
+                if d is None and len(bucket) > 1:
+                    # Multi-contract call rejected (keyless API): ask for each contract alone
+                    parts = await asyncio.gather(*(self._request(plat, [a]) for a in bucket), return_exceptions=True)
+                    d = {}
+                    for part in parts:
+                        if isinstance(part, dict):
+                            d.update(part)
+            if not isinstance(d, dict):
+                d = {}
+            for addr, futs in bucket.items():
+                # EVM contracts come back lowercased; Solana mints keep their case
+                md = d.get(addr) or d.get(addr.lower())
+                res = {"price": md.get("usd"), "vol": md.get("usd_24h_vol"), "cap": md.get("usd_market_cap")} if isinstance(md, dict) else None
+                for fut in futs:
+                    if not fut.done():
+                        fut.set_result(res)
+        except Exception as e:
+            for futs in bucket.values():
+                for fut in futs:
+                    if not fut.done():
+                        fut.set_exception(e)
+        finally:
+            for futs in bucket.values():
+                for fut in futs:
+                    if not fut.done():
+                        fut.set_result(None)
+
+MARKETS = MarketBatcher()
 
 @simple_cache()
 async def fetch_market(chain, addr):
     plat = PLATFORMS.get(chain)
     if not plat: return None
-    async with aiohttp.ClientSession() as s:
-        async with s.get(f"{COINGECKO}/coins/{plat}/contract/{addr}") as r:
-            if r.status!=200: return None
-            md = (await r.json()).get("market_data", {})
-            return {
-                "price": md["current_price"]["usd"],
-                "vol": md["total_volume"]["usd"],
-                "cap": md["market_cap"]["usd"],
-            }
+    return await MARKETS.get(plat, addr)
@@ -1,25 +1,219 @@
 import time
 import os
+import sys
+import asyncio
+import functools
+import contextvars
+from collections import OrderedDict, deque
 from telegram.ext import ContextTypes
+from .metrics import track_cache
+from .ratelimit import REQUEST_PRIORITY, promote
 
-CACHE = {}
 EXPIRY = int(os.getenv("CACHE_EXPIRY", 300))
+MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 2000))
+MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 256 * 1024 * 1024))
 
-def simple_cache(expiry: int = EXPIRY):
+_MISSING = object()
+
+def approx_size(obj) -> int:
+    # Rough deep size of JSON-like data; good enough for a memory budget
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += approx_size(k) + approx_size(v)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            size += approx_size(v)
+    return size
+
+class TTLCache:
+    """LRU cache with per-entry TTLs, an entry cap and an approximate byte budget.
+
+    Entries are kept in LRU order; expiry is tracked in one deque per TTL, which
+    stays sorted by deadline, so ``expire()`` only touches entries that are due.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (deadline, size, value)
+        self._deadlines = {}        # ttl -> deque of (deadline, key)
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry[0] <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def set(self, key, value, ttl: float = EXPIRY):
+        if key in self._data:
+            self._drop(key)
+        deadline = time.monotonic() + ttl
+        size = approx_size(value)
+        self._data[key] = (deadline, size, value)
+        self._deadlines.setdefault(ttl, deque()).append((deadline, key))
+        self.bytes += size
+        while self._data and (len(self._data) > self.max_entries or self.bytes > self.max_bytes):
+            oldest = next(iter(self._data))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        self._drop(key)
+        return entry[2]
+
+    def expire(self):
+        now = time.monotonic()
+        for ttl, queue in list(self._deadlines.items()):
+            while queue and queue[0][0] <= now:
+                deadline, key = queue.popleft()
+                entry = self._data.get(key)
+                # Skip stale markers for keys that were since evicted or refreshed
+                if entry is not None and entry[0] == deadline:
+                    self._drop(key)
+                    self.expirations += 1
+            if not queue:
+                del self._deadlines[ttl]
+
+    def clear(self):
+        self._data.clear()
+        self._deadlines.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _drop(self, key):
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
+
+CACHE = TTLCache()
+track_cache("data", CACHE)
+
+# Shared tasks for calls currently in progress, keyed like CACHE
+INFLIGHT: dict = {}
+# Shared task -> callers currently awaiting it
+WAITERS: dict = {}
+# Shared task -> the context it runs in, so a joining caller can raise its priority
+CONTEXTS: dict = {}
+# Task -> shared task it is currently awaiting through coalesce
+AWAITING: dict = {}
+
+def _release(key, task):
+    if INFLIGHT.get(key) is task:
+        del INFLIGHT[key]
+    CONTEXTS.pop(task, None)
+    # Mark the result as retrieved even if every waiter was cancelled
+    if not task.cancelled():
+        task.exception()
+
+def _promote(task, priority: int):
+    # Raise a shared call, and the shared calls it is itself waiting on, to `priority`
+    current = asyncio.current_task()
+    while task is not None and task is not current:
+        ctx = CONTEXTS.get(task)
+        if ctx is None or ctx.run(REQUEST_PRIORITY.get) <= priority:
+            return
+        ctx.run(REQUEST_PRIORITY.set, priority)
+        promote(task, priority)
+        task = AWAITING.get(task)
+
+async def coalesce(key, factory, cancel_orphaned: bool = False):
+    """Run ``factory()`` once per key; concurrent callers await the same task.
+
+    Errors propagate to every waiter and are not cached. A cancelled waiter
+    only stops waiting; the shared call keeps running for the others, or,
+    with ``cancel_orphaned``, is cancelled once nobody is waiting for it.
+
+    The shared call runs at the most urgent REQUEST_PRIORITY among its
+    waiters: a joining caller raises it, including rate-limiter slots it is
+    already queued for and shared calls it is waiting on. Batches already
+    handed to MarketBatcher keep the priority they were sent with.
+    """
+    task = INFLIGHT.get(key)
+    if task is None:
+        ctx = contextvars.copy_context()
+        task = asyncio.get_running_loop().create_task(factory(), context=ctx)
+        INFLIGHT[key] = task
+        CONTEXTS[task] = ctx
+        task.add_done_callback(functools.partial(_release, key))
+    else:
+        _promote(task, REQUEST_PRIORITY.get())
+    me = asyncio.current_task()
+    AWAITING[me] = task
+    WAITERS[task] = WAITERS.get(task, 0) + 1
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        if cancel_orphaned and WAITERS[task] == 1 and not task.done():
+            task.cancel()
+        raise
+    finally:
+        AWAITING.pop(me, None)
+        WAITERS[task] -= 1
+        if not WAITERS[task]:
+            del WAITERS[task]
+
+def single_flight(key=None, cancel_orphaned: bool = False):
+    # key(*args, **kwargs) picks the identity of a call when args aren't hashable or stable
     def decorator(fn):
+        @functools.wraps(fn)
         async def wrapper(*args, **kwargs):
-            key = (fn.__name__, args, frozenset(kwargs.items()))
-            now = time.time()
-            if key in CACHE and now - CACHE[key][0] < expiry:
-                return CACHE[key][1]
+            k = key(*args, **kwargs) if key else (args, frozenset(kwargs.items()))
+            return await coalesce((fn.__name__, k), lambda: fn(*args, **kwargs), cancel_orphaned)
+        return wrapper
+    return decorator
+
+def simple_cache(expiry: int | None = None):
+    # Without an explicit expiry, CACHE_TTL_<FN_NAME> overrides CACHE_EXPIRY per function
+    def decorator(fn):
+        ttl = expiry if expiry is not None else int(os.getenv(f"CACHE_TTL_{fn.__name__.upper()}", EXPIRY))
+
+        async def call(key, args, kwargs):
             res = await fn(*args, **kwargs)
-            CACHE[key] = (now, res)
+            # None means the upstream failed or had nothing (HTTP error, 429s exhausted,
+            # rejected batch); don't let it blank the token for the whole TTL
+            if res is not None:
+                CACHE.set(key, res, ttl)
             return res
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            key = (fn.__name__, args, frozenset(kwargs.items()))
+            res = CACHE.get(key, _MISSING)
+            if res is not _MISSING:
+                return res
+            return await coalesce(key, lambda: call(key, args, kwargs))
+        wrapper.ttl = ttl
         return wrapper
     return decorator
 
 async def cleanup_cache(context: ContextTypes.DEFAULT_TYPE):
-    now = time.time()
-    keys = [k for k, (t, _) in CACHE.items() if now - t > EXPIRY]
-    for k in keys:
-        del CACHE[k]
+    CACHE.expire()
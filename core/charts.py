@@ -0,0 +1,50 @@
+import io
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from .workers import run_in_worker
+
+HOLDER_COLORS = ['#ff9999', '#66b3ff', '#99ff99', '#ffcc99', '#c2c2f0']  # Custom colors
+
+# Figures built once per worker process and reused for every chart of that kind
+_TEMPLATES = {}
+
+def _holders_template():
+    if "holders" not in _TEMPLATES:
+        fig = Figure(figsize=(10, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.set_xlabel("Holders")
+        ax.set_ylabel("Percentage (%)")
+        ax.set_title("Top 5 Holders Distribution")
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+        _TEMPLATES["holders"] = (fig, ax)
+    return _TEMPLATES["holders"]
+
+def render_holders_chart(labels: list[str], sizes: list[float]) -> bytes:
+    """Top-holders bar chart as PNG bytes. Runs inside a worker process."""
+    fig, ax = _holders_template()
+    # Drop the previous chart's bars and labels, keep axes styling
+    for artist in list(ax.patches) + list(ax.texts):
+        artist.remove()
+
+    xs = range(len(sizes))
+    bars = ax.bar(xs, sizes, color=HOLDER_COLORS[:len(sizes)])
+    ax.set_xticks(list(xs), labels, rotation=45, ha='right')
+
+    # Add percentage labels on top of bars
+    for bar in bars:
+        yval = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2, yval + 0.5, f'{yval:.2f}%', ha='center', va='bottom')
+
+    ax.relim()
+    ax.autoscale_view()
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight')
+    return buf.getvalue()
+
+async def holders_chart(nodes: list[dict]) -> bytes:
+    labels = [f"{n['address'][:6]}...{n['address'][-4:]}{' (C)' if n['is_contract'] else ''}" for n in nodes]
+    sizes = [n['percentage'] for n in nodes]
+    return await run_in_worker(render_holders_chart, labels, sizes)
@@ -0,0 +1,64 @@
+import numpy as np
+from .cache import simple_cache
+from .analysis import fetch_analysis
+
+def find_roots(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Array-based union-find: root index of every node's connected component.
+
+    Each round hooks the larger root of every link onto the smaller one, then
+    compresses all paths by pointer jumping, so the whole pass stays in NumPy.
+    """
+    parent = np.arange(n, dtype=np.int64)
+    while True:
+        rs, rd = parent[src], parent[dst]
+        differ = rs != rd
+        if not differ.any():
+            return parent
+        lo = np.minimum(rs[differ], rd[differ])
+        hi = np.maximum(rs[differ], rd[differ])
+        np.minimum.at(parent, hi, lo)
+        # Path compression: jump until every node points straight at its root
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+class ClusterSummary:
+    """Connected groups of wallets (two or more linked holders) and their combined supply."""
+
+    __slots__ = ("cluster_count", "clustered_share", "sizes", "shares")
+
+    def __init__(self, percentages: np.ndarray, src: np.ndarray, dst: np.ndarray):
+        n = len(percentages)
+        ok = (src >= 0) & (dst >= 0)
+        roots = find_roots(n, src[ok], dst[ok])
+        sizes = np.bincount(roots, minlength=n)
+        shares = np.bincount(roots, weights=percentages, minlength=n)
+        clustered = np.flatnonzero(sizes >= 2)
+        order = clustered[np.argsort(-shares[clustered], kind="stable")]
+        self.sizes = sizes[order]
+        self.shares = shares[order]
+        self.cluster_count = len(order)
+        self.clustered_share = float(self.shares.sum())
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self.sizes.nbytes + self.shares.nbytes
+
+    @property
+    def largest_share(self) -> float:
+        return float(self.shares[0]) if self.cluster_count else 0.0
+
+    @property
+    def largest_size(self) -> int:
+        return int(self.sizes[0]) if self.cluster_count else 0
+
+    def top(self, k: int) -> list[tuple[int, float]]:
+        return [(int(s), float(p)) for s, p in zip(self.sizes[:k], self.shares[:k])]
+
+@simple_cache()
+async def fetch_clusters(chain, addr):
+    analysis = await fetch_analysis(chain, addr)
+    if not analysis:
+        return None
+    return ClusterSummary(analysis.percentages, analysis.link_src, analysis.link_dst)
@@ -0,0 +1,53 @@
+import os
+from .workers import run_in_worker
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+# Bodies at least this large are decoded in the worker pool instead of on the loop
+DECODE_OFFLOAD_BYTES = int(os.getenv("DECODE_OFFLOAD_BYTES", 256 * 1024))
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", 64 * 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
+
+BUBBLE_FIELDS = ("full_name", "symbol", "supply", "is_X721", "dt_update", "version")
+
+def project_bubble(d: dict) -> dict:
+    """Keep only the map-data fields the handlers read."""
+    out = {k: d.get(k) for k in BUBBLE_FIELDS if k in d}
+    out["nodes"] = [
+        {"address": n.get("address"), "percentage": n.get("percentage"), "is_contract": n.get("is_contract")}
+        for n in d.get("nodes") or []
+    ]
+    out["links"] = [
+        {"source": l.get("source"), "target": l.get("target"),
+         "forward": l.get("forward", 0), "backward": l.get("backward", 0)}
+        for l in d.get("links") or []
+    ]
+    out["token_links"] = [
+        {"address": t.get("address"), "symbol": t.get("symbol")}
+        for t in d.get("token_links") or []
+    ]
+    return out
+
+def decode(raw: bytes, project=None):
+    data = _loads(raw)
+    return project(data) if project else data
+
+async def read_body(resp) -> bytes:
+    chunks, size = [], 0
+    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ValueError(f"Response body over {MAX_BODY_BYTES} bytes from {resp.url}")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+async def decode_json(raw: bytes, project=None):
+    # ``project`` must be a module-level function so it can be sent to a worker
+    if len(raw) >= DECODE_OFFLOAD_BYTES:
+        return await run_in_worker(decode, raw, project)
+    return decode(raw, project)
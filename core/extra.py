@@ -1,8 +1,12 @@
 from typing import List, Dict, Tuple
+from .storage import STORAGE
+from .metrics import Callback
 
 GLOBAL_FAVS: Dict[Tuple[str,str],int] = {}
 TOTAL = 0
 
+Callback("bubblesnitch_scans_total", "Token scans since the bot was first deployed", "counter", lambda: TOTAL)
+
 def update_global_on_add(c,a):
     GLOBAL_FAVS[(c,a)] = GLOBAL_FAVS.get((c,a),0)+1
 
@@ -13,6 +17,13 @@ def update_global_on_remove(c,a):
 
 def increment_scans():
     global TOTAL; TOTAL+=1
+    STORAGE.increment("scans")
+
+async def init_stats(app):
+    # Global counters are small and needed right away; per-user favorites load lazily
+    global TOTAL
+    GLOBAL_FAVS.update(await STORAGE.load_global_favorites())
+    TOTAL = await STORAGE.load_counter("scans")
 
 def get_stats(user_favs:List[dict]) -> str:
     return (
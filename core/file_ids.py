@@ -0,0 +1,44 @@
+import os
+from telegram.error import BadRequest
+from .cache import TTLCache
+from .render_cache import normalize_address
+from .metrics import track_cache, UPLOAD_SECONDS
+from .tracing import span
+
+FILE_ID_TTL = int(os.getenv("FILE_ID_TTL", 86400))
+
+# (chain, address, kind, version) -> Telegram file_id of an image we already uploaded
+FILE_IDS = TTLCache(max_entries=int(os.getenv("FILE_ID_MAX_ENTRIES", 10000)))
+track_cache("file_ids", FILE_IDS)
+
+def file_id_key(chain: str, address: str, kind: str, version) -> tuple:
+    return (chain, normalize_address(address), kind, version)
+
+async def reply_photo_cached(reply_photo, key: tuple, render, ttl: int = FILE_ID_TTL,
+                             before_send=None, cacheable=None, **kwargs):
+    """Send a photo by file_id when this exact image was uploaded before.
+
+    ``render`` is only awaited on a miss; returns the sent message, or None
+    when there was nothing to send. ``before_send``, if given, is awaited
+    right before a file_id resend, the point a hit is known to have an image.
+    ``cacheable()``, checked after a render, can keep a stand-in image from
+    being resent under ``key``.
+    """
+    file_id = FILE_IDS.get(key)
+    if file_id:
+        if before_send:
+            await before_send()
+        try:
+            with UPLOAD_SECONDS.time(source="file_id"), span("send_file_id"):
+                return await reply_photo(photo=file_id, **kwargs)
+        except BadRequest:
+            # Telegram no longer accepts it; fall through to a fresh upload
+            FILE_IDS.pop(key)
+    photo = await render()
+    if not photo:
+        return None
+    with UPLOAD_SECONDS.time(source="upload"), span("upload"):
+        message = await reply_photo(photo=photo, **kwargs)
+    if message and message.photo and (cacheable is None or cacheable()):
+        FILE_IDS.set(key, message.photo[-1].file_id, ttl)
+    return message
@@ -0,0 +1,65 @@
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from heapq import heappush, heapreplace
+
+def _ratio(matches: int, length: int) -> float:
+    # difflib's own formula, so bounds compare against the cutoff exactly as it does
+    return 2.0 * matches / length if length else 1.0
+
+class FuzzyMatcher:
+    """``difflib.get_close_matches`` over a fixed word list, indexed once.
+
+    Candidates are pruned with difflib's quick_ratio bound (characters shared
+    as multisets), summed for every word at once from a character index
+    instead of per word. Survivors are scored best bound first, stopping once
+    no remaining bound can beat the n-th match found. Results, including tie
+    order, match get_close_matches(word, words, n, cutoff) exactly.
+    """
+
+    def __init__(self, words, cutoff: float = 0.7, cache_size: int = 1024):
+        if not 0.0 <= cutoff <= 1.0:
+            raise ValueError(f"cutoff must be in [0.0, 1.0]: {cutoff!r}")
+        self.words = tuple(dict.fromkeys(words))
+        self.cutoff = cutoff
+        # (char, k) -> words holding char at least k times, so a query's
+        # overlap with every word is a run of Counter.update calls
+        self._postings = defaultdict(list)
+        for w in self.words:
+            for ch, count in Counter(w).items():
+                for k in range(1, count + 1):
+                    self._postings[ch, k].append(w)
+        self._cached = lru_cache(maxsize=cache_size)(self._match)
+
+    def match(self, word: str, n: int = 1) -> list[str]:
+        # Recent lookups are cached; junk commands in groups tend to repeat
+        return list(self._cached(word, n))
+
+    def _match(self, word: str, n: int) -> tuple:
+        if not n > 0:
+            raise ValueError(f"n must be > 0: {n!r}")
+        lw = len(word)
+        overlap = Counter()
+        for ch, wc in Counter(word).items():
+            for k in range(1, wc + 1):
+                overlap.update(self._postings.get((ch, k), ()))
+        # Words sharing no character can only reach a zero cutoff (or tie two empty strings)
+        pool = overlap if self.cutoff > 0 and lw else self.words
+        candidates = sorted(((_ratio(overlap[w], len(w) + lw), w) for w in pool), reverse=True)
+
+        # Best bounds first: once n matches are in hand, a candidate whose bound
+        # is below the weakest of them can't place, nor can any after it
+        s = SequenceMatcher()
+        s.set_seq2(word)
+        best = []  # min-heap of the n best (score, word)
+        for bound, w in candidates:
+            if bound < self.cutoff or (len(best) == n and bound < best[0][0]):
+                break
+            s.set_seq1(w)
+            score = s.ratio()
+            if score >= self.cutoff:
+                if len(best) < n:
+                    heappush(best, (score, w))
+                elif (score, w) > best[0]:
+                    heapreplace(best, (score, w))
+        return tuple(w for _, w in sorted(best, reverse=True))
@@ -0,0 +1,35 @@
+import io
+from PIL import Image
+
+# Telegram photo limits: 10 MB, width + height <= 10000, aspect ratio <= 20
+TELEGRAM_MAX_BYTES = 10 * 1024 * 1024
+TELEGRAM_MAX_SUM = 10000
+
+PIL_FORMATS = {"png": "PNG", "jpeg": "JPEG", "webp": "WEBP"}
+
+def encode_for_telegram(data: bytes, fmt: str, quality: int, max_side: int) -> bytes:
+    """Re-encode and downscale an image so it fits Telegram's photo limits.
+
+    Blocking (Pillow); call it off the event loop. Returns ``data`` untouched
+    when it is already in ``fmt`` and within limits.
+    """
+    img = Image.open(io.BytesIO(data))
+    w, h = img.size
+    scale = min(1.0, max_side / max(w, h), TELEGRAM_MAX_SUM / (w + h))
+    same_format = (img.format or "").upper() == PIL_FORMATS[fmt]
+    if scale == 1.0 and same_format and len(data) <= TELEGRAM_MAX_BYTES:
+        return data
+
+    if scale < 1.0:
+        img = img.resize((max(1, int(w * scale)), max(1, int(h * scale))), Image.LANCZOS)
+    if fmt == "jpeg" and img.mode != "RGB":
+        img = img.convert("RGB")
+    while True:
+        out = io.BytesIO()
+        if fmt == "png":
+            img.save(out, "PNG", optimize=True)
+        else:
+            img.save(out, PIL_FORMATS[fmt], quality=quality)
+        if out.tell() <= TELEGRAM_MAX_BYTES or max(img.size) < 256:
+            return out.getvalue()
+        img = img.resize((img.width * 3 // 4, img.height * 3 // 4), Image.LANCZOS)
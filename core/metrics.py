@@ -0,0 +1,145 @@
+import time
+import functools
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from cache hits up to slow browser renders
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60)
+
+# name -> metric, in registration order; re-registering a name replaces it
+_METRICS: dict = {}
+_CACHES: dict = {}
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _num(value) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _METRICS[name] = self
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self):
+        return ()
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, pairs, value in self.samples():
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+            lines.append(f"{name}{{{labels}}} {_num(value)}" if labels else f"{name} {_num(value)}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name, list(zip(self.labelnames, key)), value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # label key -> [per-bucket counts, sum, count]
+        self._values = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        i = bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            state[0][i] += 1
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        for key, (counts, total, count) in self._values.items():
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for le, c in zip(self.buckets, counts):
+                cumulative += c
+                yield f"{self.name}_bucket", pairs + [("le", _num(le))], cumulative
+            yield f"{self.name}_bucket", pairs + [("le", "+Inf")], count
+            yield f"{self.name}_sum", pairs, total
+            yield f"{self.name}_count", pairs, count
+
+class Callback(Metric):
+    """Value read at scrape time: ``fn`` returns a number, or {label tuple: number}."""
+
+    def __init__(self, name, help, kind, fn, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self):
+        value = self.fn()
+        if not isinstance(value, dict):
+            yield self.name, [], value
+            return
+        for key, v in value.items():
+            yield self.name, list(zip(self.labelnames, key)), v
+
+HANDLER_SECONDS = Histogram("bubblesnitch_handler_seconds", "Handler latency", ("handler",))
+UPSTREAM_SECONDS = Histogram("bubblesnitch_upstream_seconds", "Upstream HTTP call latency", ("host",))
+UPSTREAM_REQUESTS = Counter("bubblesnitch_upstream_requests_total", "Upstream HTTP calls by status", ("host", "status"))
+RENDER_SECONDS = Histogram("bubblesnitch_render_seconds", "Bubble map render latency", ("mode",))
+UPLOAD_SECONDS = Histogram("bubblesnitch_telegram_photo_seconds", "Telegram photo send latency", ("source",))
+
+def _cache_stat(stat):
+    return lambda: {(name,): cache.stats()[stat] for name, cache in _CACHES.items()}
+
+for _stat, _kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"),
+                     ("expirations", "counter"), ("entries", "gauge"), ("bytes", "gauge")):
+    _suffix = "_total" if _kind == "counter" else ""
+    Callback(f"bubblesnitch_cache_{_stat}{_suffix}", f"Cache {_stat}", _kind, _cache_stat(_stat), ("cache",))
+
+def track_cache(name: str, cache):
+    """Expose a TTLCache's stats() under cache="<name>"."""
+    _CACHES[name] = cache
+
+def timed(handler: str):
+    """Record a handler's latency in HANDLER_SECONDS."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with HANDLER_SECONDS.time(handler=handler):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def render() -> str:
+    lines = []
+    for metric in list(_METRICS.values()):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
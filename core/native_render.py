@@ -0,0 +1,97 @@
+import io
+import os
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from .imaging import encode_for_telegram
+
+NATIVE_MAX_NODES = int(os.getenv("NATIVE_MAX_NODES", 300))
+NATIVE_ITERATIONS = int(os.getenv("NATIVE_ITERATIONS", 80))
+
+BACKGROUND = "#0e0e1a"
+WALLET_COLOR = "#7b61ff"
+CONTRACT_COLOR = "#ff9f43"
+EDGE_COLOR = "#9aa0c3"
+
+def graph_arrays(analysis, max_nodes: int = NATIVE_MAX_NODES):
+    """Holder percentages, contract flags and edge endpoints for the largest holders."""
+    pct = analysis.percentages
+    keep = np.argsort(-pct, kind="stable")[:max_nodes]
+    # Old node index -> position in the kept set, -1 when dropped
+    remap = np.full(len(pct) + 1, -1, dtype=np.int64)
+    remap[keep] = np.arange(len(keep))
+
+    # Malformed endpoints are -1 in the analysis and map to the trailing -1 slot
+    src, dst = remap[analysis.link_src], remap[analysis.link_dst]
+    ok = (src >= 0) & (dst >= 0) & (src != dst)
+    return pct[keep], analysis.is_contract[keep], src[ok], dst[ok]
+
+def force_layout(n: int, src: np.ndarray, dst: np.ndarray, radii: np.ndarray,
+                 iterations: int = NATIVE_ITERATIONS, seed: int = 7) -> np.ndarray:
+    """Fruchterman-Reingold layout, vectorised over all node pairs per step."""
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-1, 1, size=(n, 2))
+    if n < 2:
+        return pos
+    k = 1.0 / np.sqrt(n)
+    # Pairs closer than their combined radii push apart harder, so bubbles rarely overlap
+    min_gap = radii[:, None] + radii[None, :]
+    temp = 0.1
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        dist = np.maximum(np.linalg.norm(delta, axis=-1), 1e-3)
+        force = k * k / dist + np.where(dist < min_gap, (min_gap - dist) * 4, 0.0)
+        np.fill_diagonal(force, 0.0)
+        disp = (delta * (force / dist)[..., None]).sum(axis=1)
+
+        if len(src):
+            d = pos[src] - pos[dst]
+            dl = np.maximum(np.linalg.norm(d, axis=1), 1e-3)
+            pull = d * (dl / k)[:, None]
+            np.add.at(disp, src, -pull)
+            np.add.at(disp, dst, pull)
+
+        disp -= pos * (8 * k)  # gravity keeps unlinked holders on screen
+        length = np.maximum(np.linalg.norm(disp, axis=1), 1e-9)
+        pos += disp * (np.minimum(length, temp) / length)[:, None]
+        temp *= 0.95
+    return pos
+
+def render_bubble_map(analysis, title: str, fmt: str, quality: int, max_side: int,
+                      size=(1280, 720)) -> bytes:
+    """Draw the holder graph as bubbles sized by supply share. Blocking; run off the loop."""
+    pct, contract, src, dst = graph_arrays(analysis)
+    radii = 0.01 + 0.2 * np.sqrt(pct / 100.0)
+    pos = force_layout(len(pct), src, dst, radii)
+
+    fig = Figure(figsize=(size[0] / 100, size[1] / 100), dpi=100, facecolor=BACKGROUND)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_facecolor(BACKGROUND)
+    ax.set_aspect("equal")
+    ax.axis("off")
+
+    if len(src):
+        ax.add_collection(LineCollection(
+            np.stack([pos[src], pos[dst]], axis=1), colors=EDGE_COLOR, linewidths=0.6, alpha=0.35,
+        ))
+    # Marker area is in points^2; scale from data-space radii to the figure
+    span = max(np.ptp(pos[:, 0]), np.ptp(pos[:, 1]), 1e-3) if len(pos) else 1.0
+    points_per_unit = min(size) * 0.72 / (span + 2 * radii.max(initial=0.05))
+    ax.scatter(
+        pos[:, 0], pos[:, 1],
+        s=(2 * radii * points_per_unit) ** 2,
+        c=np.where(contract, CONTRACT_COLOR, WALLET_COLOR),
+        alpha=0.85, edgecolors="white", linewidths=0.4,
+    )
+    for i in np.argsort(-pct)[:5]:
+        ax.annotate(f"{pct[i]:.2f}%", pos[i], ha="center", va="center", color="white", fontsize=8)
+
+    ax.set_title(title, color="white", fontsize=12, y=0.96)
+    ax.autoscale_view()
+    ax.margins(0.08)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", facecolor=BACKGROUND)
+    return encode_for_telegram(buf.getvalue(), fmt, quality, max_side)
@@ -1,11 +1,152 @@
-import uuid, asyncio
+import asyncio
+import os
 import sys
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
 from telegram.ext import ContextTypes
 from playwright.async_api import async_playwright
+from .cache import single_flight
+from .render_cache import render_key, normalize_address, get_render, put_render
+from .imaging import encode_for_telegram
+from .native_render import render_bubble_map
+from .api_clients import fetch_bubble
+from .analysis import fetch_analysis
+from .metrics import Callback, RENDER_SECONDS
+from .tracing import span
 
 sys.stdout.reconfigure(encoding="utf-8")
 
+# browser: Playwright only; native: draw the map locally from map-data;
+# auto: Playwright, falling back to native when it fails or times out
+RENDER_MODE = os.getenv("RENDER_MODE", "auto").lower()
+BUBBLEMAPS_APP_URL = os.getenv("BUBBLEMAPS_APP_URL", "https://app.bubblemaps.io").rstrip("/")
+BROWSER_RENDER_TIMEOUT = float(os.getenv("BROWSER_RENDER_TIMEOUT", 90))
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 3))
+VIEWPORT = {"width": 1280, "height": 720}
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "jpeg").lower().replace("jpg", "jpeg")
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", 85))
+SCREENSHOT_MAX_SIDE = int(os.getenv("SCREENSHOT_MAX_SIDE", 2560))
+# Element whose bounding box the shot is clipped to; empty for the full page
+SCREENSHOT_CLIP_SELECTOR = os.getenv("SCREENSHOT_CLIP_SELECTOR", "canvas")
+RENDER_VARIANT = f"{SCREENSHOT_FORMAT}:{SCREENSHOT_QUALITY}:{SCREENSHOT_MAX_SIDE}:{SCREENSHOT_CLIP_SELECTOR}"
+# Fast mode: block non-map resources, wait for a "map drawn" signal instead of
+# fixed timeouts, and dismiss the dialog straight from the DOM
+FAST_RENDER = os.getenv("FAST_RENDER", "1") == "1"
+MAP_READY_TIMEOUT = int(os.getenv("MAP_READY_TIMEOUT", 20000))
+MAP_READY_SELECTOR = os.getenv("MAP_READY_SELECTOR", "canvas, svg circle")
+# Without a readable drawn-content signal, capture once the map element has been up this long (ms)
+MAP_SETTLE_MS = int(os.getenv("MAP_SETTLE_MS", 2500))
+BLOCKED_RESOURCE_TYPES = {"font", "media", "manifest", "websocket", "eventsource"}
+BLOCKED_HOSTS = {
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "hotjar.com",
+    "segment.io", "segment.com", "mixpanel.com", "sentry.io", "intercom.io",
+    "facebook.net", "clarity.ms", "plausible.io", "fonts.googleapis.com", "fonts.gstatic.com",
+} | {h.strip() for h in os.getenv("BLOCKED_HOSTS", "").split(",") if h.strip()}
+# Ready when bubbles are actually drawn: an SVG circle, or a canvas whose pixels are not
+# blank. The canvas is sized at mount, before data loads, so its size alone proves nothing.
+# A canvas we can't read back (WebGL without preserveDrawingBuffer, tainted) instead
+# counts once it has been laid out for `settle` ms.
+MAP_READY_JS = """({sel, settle}) => {
+    const drawn = el => {
+        try {
+            const probe = document.createElement('canvas');
+            probe.width = probe.height = 32;
+            const ctx = probe.getContext('2d');
+            ctx.drawImage(el, 0, 0, 32, 32);
+            const px = ctx.getImageData(0, 0, 32, 32).data;
+            const colors = new Set();
+            for (let i = 0; i < px.length; i += 4) {
+                if (px[i + 3] > 0) colors.add((px[i] << 16) | (px[i + 1] << 8) | px[i + 2]);
+                if (colors.size > 3) return true;
+            }
+        } catch (e) {}
+        return false;
+    };
+    let sized = false;
+    for (const el of document.querySelectorAll(sel)) {
+        const r = el.getBoundingClientRect();
+        if (el.tagName.toLowerCase() === 'circle') {
+            if (r.width > 0) return true;
+        } else if (r.width > 100 && r.height > 100) {
+            if (drawn(el)) return true;
+            sized = true;
+        }
+    }
+    if (!sized) return false;
+    window.__mapSizedAt = window.__mapSizedAt || performance.now();
+    return performance.now() - window.__mapSizedAt >= settle;
+}"""
+HIDE_DIALOG_CSS = ".mdc-dialog, .mdc-dialog__scrim, div.mdc-dialog_actions { display: none !important; }"
+REMOVE_DIALOG_JS = """() => {
+    document.querySelectorAll('.mdc-dialog, .mdc-dialog__scrim, div.mdc-dialog_actions').forEach(el => el.remove());
+    document.body.classList.remove('mdc-dialog-scroll-lock');
+}"""
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+
+class PagePool:
+    """Fixed set of pages, each in its own browser context, checked out one render at a time."""
+
+    def __init__(self, browser, size: int = POOL_SIZE):
+        self.browser = browser
+        self.size = size
+        self.waiting = 0
+        self._idle = asyncio.Queue()
+
+    async def _new_page(self):
+        context = await self.browser.new_context(viewport=VIEWPORT, user_agent=USER_AGENT)
+        if FAST_RENDER:
+            await context.route("**/*", _block_route)
+        return await context.new_page()
+
+    async def start(self):
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._new_page())
+
+    async def _healthy(self, page) -> bool:
+        if page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(page.evaluate("1"), 5)
+            return True
+        except Exception:
+            return False
+
+    async def _replace(self, page):
+        try:
+            await page.context.close()
+        except Exception:
+            pass
+        return await self._new_page()
+
+    @asynccontextmanager
+    async def page(self):
+        self.waiting += 1
+        try:
+            with span("page_checkout"):
+                page = await self._idle.get()
+        finally:
+            self.waiting -= 1
+        try:
+            if not await self._healthy(page):
+                print("♻️ Replacing unhealthy browser page")
+                page = await self._replace(page)
+            yield page
+        finally:
+            # Always hand the slot back; a broken page is replaced on its next checkout
+            self._idle.put_nowait(page)
+
+    async def close(self):
+        while not self._idle.empty():
+            page = self._idle.get_nowait()
+            try:
+                await page.context.close()
+            except Exception:
+                pass
+
 async def init_browser(app):
+    if RENDER_MODE == "native":
+        print("🎨 Native render mode, browser not started")
+        return
     playwright = await async_playwright().start()
     browser = await playwright.chromium.launch(
         headless=False,
@@ -22,36 +163,85 @@ async def init_browser(app):
         ],
         timeout=60000
     )
-    context = await browser.new_context(
-        viewport={"width": 1280, "height": 720},
-        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
-    )
-    page = await context.new_page()
+    pool = PagePool(browser)
+    await pool.start()
+    Callback("bubblesnitch_browser_queue_depth", "Renders waiting for a browser page", "gauge", lambda: pool.waiting)
+    Callback("bubblesnitch_browser_pages_idle", "Browser pages free for a render", "gauge", pool._idle.qsize)
     app.bot_data["browser"] = {
         "playwright": playwright,
         "browser": browser,
-        "context": context,
-        "page": page
+        "pool": pool
     }
-    print("✅ Browser ready")
+    print(f"✅ Browser ready ({pool.size} pages)")
 
 async def shutdown_browser(app):
     bundle = app.bot_data.get("browser")
     if bundle:
-        await bundle["context"].close()
+        await bundle["pool"].close()
         await bundle["browser"].close()
         await bundle["playwright"].stop()
         print("🔒 Browser closed")
 
-async def take_screenshot(chain: str, address: str, bundle) -> str | None:
-    page = bundle["page"]
-    path = f"/tmp/map_{chain}_{uuid.uuid4().hex[:6]}.png"
+async def take_screenshot(chain: str, address: str, bundle) -> bytes | None:
+    async with bundle["pool"].page() as page:
+        return await _capture(page, chain, address)
 
-    url = f"https://app.bubblemaps.io/{chain}/token/{address}"
-    print(f"🌐 Navigating to {url}")
+async def _map_clip(page):
+    if not SCREENSHOT_CLIP_SELECTOR:
+        return None
+    try:
+        box = await page.locator(SCREENSHOT_CLIP_SELECTOR).first.bounding_box(timeout=2000)
+    except Exception:
+        return None
+    if not box or box["width"] < 100 or box["height"] < 100:
+        return None
+    return box
+
+async def _block_route(route):
+    request = route.request
+    host = urlsplit(request.url).hostname or ""
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(
+        host == h or host.endswith("." + h) for h in BLOCKED_HOSTS
+    ):
+        await route.abort()
+    else:
+        await route.continue_()
 
+async def _open_fast(page, url):
     try:
-        await page.goto(url, timeout=120000, wait_until="domcontentloaded")
+        with span("navigation"):
+            await page.goto(url, timeout=30000, wait_until="domcontentloaded")
+        print("🟢 Navigation complete")
+    except Exception as nav_err:
+        print(f"⚠️ Navigation warning: {nav_err}")
+
+    # Hide the MDC dialog with CSS instead of waiting for it and clicking close
+    try:
+        with span("dialog_dismiss"):
+            await page.add_style_tag(content=HIDE_DIALOG_CSS)
+    except Exception as e:
+        print(f"⚠️ Could not inject dialog CSS: {str(e)[:100]}")
+
+    try:
+        with span("map_ready"):
+            await page.wait_for_function(
+                MAP_READY_JS, arg={"sel": MAP_READY_SELECTOR, "settle": MAP_SETTLE_MS},
+                timeout=MAP_READY_TIMEOUT, polling="raf",
+            )
+        print("🗺 Map rendered")
+    except Exception:
+        print("⚠️ Map ready signal not seen, capturing anyway")
+
+    try:
+        with span("dialog_remove"):
+            await page.evaluate(REMOVE_DIALOG_JS)
+    except Exception:
+        pass
+
+async def _open_legacy(page, url):
+    try:
+        with span("navigation"):
+            await page.goto(url, timeout=120000, wait_until="domcontentloaded")
         print("🟢 Navigation complete")
     except Exception as nav_err:
         print(f"⚠️ Navigation warning: {nav_err}")
@@ -85,7 +275,8 @@ async def take_screenshot(chain: str, address: str, bundle) -> str | None:
             return False
 
     # Execute close sequence
-    popup_closed = await close_mdc_dialog()
+    with span("dialog_dismiss"):
+        popup_closed = await close_mdc_dialog()
 
     # Fallback sequence if primary method fails
     if not popup_closed:
@@ -107,23 +298,93 @@ async def take_screenshot(chain: str, address: str, bundle) -> str | None:
         except:
             print("⚠️ Dialog might still be present")
 
-    # Final screenshot capture
+
+async def _capture(page, chain: str, address: str) -> bytes | None:
+    url = f"{BUBBLEMAPS_APP_URL}/{chain}/token/{address}"
+    print(f"🌐 Navigating to {url}")
+
+    if FAST_RENDER:
+        await _open_fast(page, url)
+    else:
+        await _open_legacy(page, url)
+
+    # Final screenshot capture, kept in memory
     print("📸 Taking screenshot")
     try:
-        await page.screenshot(
-            path=path,
-            full_page=True,
-            animations="disabled",
-            mask=[page.locator("div.mdc-dialog_actions")]
-        )
-        print(f"✅ Screenshot saved: {path}")
-        return path
+        opts = {
+            "animations": "disabled",
+            "mask": [page.locator("div.mdc-dialog_actions")],
+        }
+        # Playwright encodes PNG or JPEG itself; WebP is converted afterwards
+        if SCREENSHOT_FORMAT == "jpeg":
+            opts.update(type="jpeg", quality=SCREENSHOT_QUALITY)
+        clip = await _map_clip(page)
+        if clip:
+            opts["clip"] = clip
+        else:
+            opts["full_page"] = True
+        with span("screenshot"):
+            raw = await page.screenshot(**opts)
+        with span("encode"):
+            data = await asyncio.to_thread(
+                encode_for_telegram, raw, SCREENSHOT_FORMAT, SCREENSHOT_QUALITY, SCREENSHOT_MAX_SIDE
+            )
+        print(f"✅ Screenshot captured: {len(data) // 1024} KB {SCREENSHOT_FORMAT}")
+        return data
     except Exception as shot_err:
         print(f"❌ Screenshot error: {shot_err}")
         return None
 
-async def generate_screenshot(chain, address, context):
-    bundle = context.bot_data.get("browser")
-    if not bundle:
+async def native_screenshot(chain: str, address: str) -> bytes | None:
+    with RENDER_SECONDS.time(mode="native"), span("native_render"):
+        return await _native_screenshot(chain, address)
+
+async def _native_screenshot(chain: str, address: str) -> bytes | None:
+    analysis = await fetch_analysis(chain, address)
+    if not analysis or not analysis.holder_count:
         return None
-    return await take_screenshot(chain, address, bundle)
+    bubble = await fetch_bubble(chain, address)
+    title = f"{bubble.get('full_name', 'N/A')} ({bubble.get('symbol', 'N/A')})"
+    with span("native_draw"):
+        return await asyncio.to_thread(
+            render_bubble_map, analysis, title, SCREENSHOT_FORMAT, SCREENSHOT_QUALITY, SCREENSHOT_MAX_SIDE
+        )
+
+# Concurrent requests for the same token share one render, dropped once nobody
+# wants it (e.g. the scan was answered from a Telegram file_id)
+@single_flight(key=lambda chain, address, context: (chain, normalize_address(address)), cancel_orphaned=True)
+async def generate_screenshot(chain, address, context) -> tuple[bytes | None, bool]:
+    """Render the token's map; returns ``(image, fallback)``.
+
+    ``fallback`` marks a native stand-in for a failed browser render in auto
+    mode. Callers must not reuse it (e.g. by file_id), or the browser would
+    not be retried until that copy expires.
+    """
+    key = render_key(chain, address, VIEWPORT, f"{RENDER_MODE}:{RENDER_VARIANT}")
+    with span("render_cache_read"):
+        cached = await get_render(key)
+    if cached:
+        return cached, False
+
+    if RENDER_MODE != "native":
+        bundle = context.bot_data.get("browser")
+        data = None
+        if bundle:
+            try:
+                with RENDER_SECONDS.time(mode="browser"), span("browser_render"):
+                    data = await asyncio.wait_for(take_screenshot(chain, address, bundle), BROWSER_RENDER_TIMEOUT)
+            except asyncio.TimeoutError:
+                print(f"⏱ Browser render timed out after {BROWSER_RENDER_TIMEOUT}s")
+        if data:
+            await put_render(key, data)
+            return data, False
+        if RENDER_MODE == "browser":
+            return None, False
+        # auto: fall back to the native map, but don't cache it so the browser is retried next time
+        print("🎨 Falling back to native render")
+        return await native_screenshot(chain, address), True
+
+    data = await native_screenshot(chain, address)
+    if data:
+        await put_render(key, data)
+    return data, False
@@ -0,0 +1,138 @@
+import os
+import time
+import heapq
+import weakref
+import asyncio
+import itertools
+import contextvars
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Priority of upstream calls made from the current task; tasks inherit it
+REQUEST_PRIORITY = contextvars.ContextVar("request_priority", default=PRIORITY_INTERACTIVE)
+
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", 60))
+
+@contextmanager
+def request_priority(priority: int):
+    token = REQUEST_PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        REQUEST_PRIORITY.reset(token)
+
+def background_priority():
+    return request_priority(PRIORITY_BACKGROUND)
+
+# Every live bucket, so a promoted task is found whichever limiter it is queued on
+_BUCKETS = weakref.WeakSet()
+
+class TokenBucket:
+    """Token bucket whose waiters are served lowest priority value first, FIFO within a priority."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._waiters = []  # heap of (priority, seq, future, owning task)
+        self._seq = itertools.count()
+        self._timer = None
+        _BUCKETS.add(self)
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, fut, _ in self._waiters if not fut.done())
+
+    def _try_take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.paused_until or self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def acquire(self, priority: int | None = None):
+        if priority is None:
+            priority = REQUEST_PRIORITY.get()
+        if not self._waiters and self._try_take():
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut, asyncio.current_task()))
+        self._schedule()
+        await fut
+
+    def promote(self, task, priority: int):
+        # Move `task`'s queued acquire up to `priority` if that is more urgent
+        changed = False
+        for i, (p, seq, fut, owner) in enumerate(self._waiters):
+            if owner is task and p > priority and not fut.done():
+                self._waiters[i] = (priority, seq, fut, owner)
+                changed = True
+        if changed:
+            heapq.heapify(self._waiters)
+
+    def pause(self, seconds: float):
+        # Upstream told us to back off (429 / Retry-After): hold every waiter until then
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._schedule()
+
+    def _drain(self):
+        self._timer = None
+        while self._waiters:
+            if self._waiters[0][2].done():  # cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            if not self._try_take():
+                break
+            heapq.heappop(self._waiters)[2].set_result(None)
+        self._schedule()
+
+    def _schedule(self):
+        if self._timer or not self._waiters:
+            return
+        now = time.monotonic()
+        delay = max(self.paused_until - now, (1 - self.tokens) / self.rate, 0)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._drain)
+
+def _rate_from_env(name: str, rate: float, burst: int) -> TokenBucket:
+    return TokenBucket(float(os.getenv(f"{name}_RATE", rate)), int(os.getenv(f"{name}_BURST", burst)))
+
+# Upstream host[:port] -> its limiter, registered by the API clients
+LIMITERS: dict[str, TokenBucket] = {}
+
+def limit_host(url: str, name: str, rate: float, burst: int):
+    # Requests per second and burst size, overridable via <NAME>_RATE / <NAME>_BURST
+    LIMITERS[urlsplit(url).netloc] = _rate_from_env(name, rate, burst)
+
+def limiter_for(url: str) -> TokenBucket | None:
+    return LIMITERS.get(urlsplit(url).netloc)
+
+def promote(task, priority: int):
+    for bucket in list(_BUCKETS):
+        bucket.promote(task, priority)
+
+def retry_after(value: str | None, attempt: int) -> float:
+    """Seconds to wait from a Retry-After header (seconds or HTTP date), else exponential backoff."""
+    delay = None
+    if value:
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                delay = None
+    if delay is None:
+        delay = 2 ** attempt
+    return min(max(delay, 0.0), RATE_LIMIT_MAX_WAIT)
@@ -0,0 +1,92 @@
+import os
+import time
+import asyncio
+import hashlib
+import tempfile
+from telegram.ext import ContextTypes
+
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "/tmp/render_cache")
+RENDER_CACHE_TTL = int(os.getenv("RENDER_CACHE_TTL", 600))
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+
+def normalize_address(address: str) -> str:
+    # EVM addresses are case-insensitive; Solana ones are not
+    return address.lower() if address.startswith("0x") else address
+
+def render_key(chain: str, address: str, viewport: dict, variant: str = "") -> str:
+    address = normalize_address(address)
+    raw = f"{chain}|{address}|{viewport['width']}x{viewport['height']}|{variant}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def _path(key: str) -> str:
+    return os.path.join(RENDER_CACHE_DIR, f"{key}.img")
+
+def _read(key: str) -> bytes | None:
+    path = _path(key)
+    try:
+        if time.time() - os.stat(path).st_mtime > RENDER_CACHE_TTL:
+            os.remove(path)
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _write(key: str, data: bytes):
+    os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+    # Unique temp name: concurrent writers of the same key must not share a file
+    fd, tmp = tempfile.mkstemp(dir=RENDER_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, _path(key))
+    except BaseException:
+        _unlink(tmp)
+        raise
+    _prune()
+
+def _prune():
+    # Drop expired renders, then the oldest ones until the directory fits the size cap
+    now = time.time()
+    entries, total = [], 0
+    try:
+        files = list(os.scandir(RENDER_CACHE_DIR))
+    except FileNotFoundError:
+        return
+    for e in files:
+        if not e.name.endswith(".img"):
+            continue
+        try:
+            st = e.stat()
+        except FileNotFoundError:
+            continue
+        if now - st.st_mtime > RENDER_CACHE_TTL:
+            _unlink(e.path)
+            continue
+        entries.append((st.st_mtime, st.st_size, e.path))
+        total += st.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= RENDER_CACHE_MAX_BYTES:
+            break
+        _unlink(path)
+        total -= size
+
+def _unlink(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+async def get_render(key: str) -> bytes | None:
+    return await asyncio.to_thread(_read, key)
+
+async def put_render(key: str, data: bytes):
+    # The cache is best effort: a full or read-only disk must not fail the render
+    try:
+        await asyncio.to_thread(_write, key, data)
+    except OSError as e:
+        print(f"⚠️ Could not cache render: {e}")
+
+async def cleanup_render_cache(context: ContextTypes.DEFAULT_TYPE):
+    await asyncio.to_thread(_prune)
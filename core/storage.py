@@ -0,0 +1,174 @@
+import os
+import time
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+DB_PATH = os.getenv("DB_PATH", "bubblesnitch.db")
+DB_FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", 2))
+DB_FLUSH_BATCH = int(os.getenv("DB_FLUSH_BATCH", 200))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS favorites (
+    user_id INTEGER NOT NULL,
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    PRIMARY KEY (user_id, chain, address)
+);
+CREATE INDEX IF NOT EXISTS favorites_by_token ON favorites (chain, address);
+CREATE TABLE IF NOT EXISTS global_favorites (
+    chain TEXT NOT NULL,
+    address TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (chain, address)
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+ADD_FAV = "INSERT OR IGNORE INTO favorites (user_id, chain, address, added_at) VALUES (?, ?, ?, ?)"
+REMOVE_FAV = "DELETE FROM favorites WHERE user_id = ? AND chain = ? AND address = ?"
+INC_GLOBAL = (
+    "INSERT INTO global_favorites (chain, address, count) VALUES (?, ?, 1) "
+    "ON CONFLICT (chain, address) DO UPDATE SET count = count + 1"
+)
+DEC_GLOBAL = "UPDATE global_favorites SET count = count - 1 WHERE chain = ? AND address = ?"
+PRUNE_GLOBAL = "DELETE FROM global_favorites WHERE count <= 0"
+ADD_COUNTER = (
+    "INSERT INTO counters (name, value) VALUES (?, ?) "
+    "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value"
+)
+
+class Storage:
+    """SQLite store with write-behind batching.
+
+    Handlers queue writes in memory and return immediately; a background task
+    flushes them in one transaction every DB_FLUSH_INTERVAL seconds, or sooner
+    once DB_FLUSH_BATCH writes are pending. All database work runs on one
+    dedicated thread.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+        self._pending: list[tuple[str, tuple]] = []
+        self._counters: dict[str, int] = {}
+        self._wake = asyncio.Event()
+        self._flusher = None
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._conn = conn
+
+    async def start(self):
+        await self._run(self._open)
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._conn:
+            await self.flush()
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    # Buffered writes
+
+    def _queue(self, *ops):
+        self._pending.extend(ops)
+        if len(self._pending) >= DB_FLUSH_BATCH:
+            self._wake.set()
+
+    def add_favorite(self, user_id: int, chain: str, address: str):
+        self._queue((ADD_FAV, (user_id, chain, address, time.time())), (INC_GLOBAL, (chain, address)))
+
+    def remove_favorite(self, user_id: int, chain: str, address: str):
+        self._queue((REMOVE_FAV, (user_id, chain, address)), (DEC_GLOBAL, (chain, address)), (PRUNE_GLOBAL, ()))
+
+    def increment(self, name: str, by: int = 1):
+        # Counters are summed in memory and written as one upsert per flush
+        self._counters[name] = self._counters.get(name, 0) + by
+
+    def _write(self, ops, counters):
+        with self._conn:
+            for sql, params in ops:
+                self._conn.execute(sql, params)
+            self._conn.executemany(ADD_COUNTER, counters.items())
+
+    async def flush(self):
+        if not self._conn or not (self._pending or self._counters):
+            return
+        ops, self._pending = self._pending, []
+        counters, self._counters = self._counters, {}
+        try:
+            await self._run(self._write, ops, counters)
+        except Exception:
+            # Keep the batch for the next attempt rather than losing writes
+            self._pending[:0] = ops
+            for name, by in counters.items():
+                self.increment(name, by)
+            raise
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), DB_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Storage flush failed: {e!r}")
+
+    # Reads (pending writes are flushed first so reads see them)
+
+    async def load_favorites(self, user_id: int) -> list[dict]:
+        await self.flush()
+        rows = await self._run(lambda: self._conn.execute(
+            "SELECT chain, address FROM favorites WHERE user_id = ? ORDER BY added_at", (user_id,)
+        ).fetchall())
+        return [{"chain": c, "address": a} for c, a in rows]
+
+    async def load_global_favorites(self) -> dict[tuple[str, str], int]:
+        await self.flush()
+        rows = await self._run(lambda: self._conn.execute(
+            "SELECT chain, address, count FROM global_favorites"
+        ).fetchall())
+        return {(c, a): n for c, a, n in rows}
+
+    async def load_subscriptions(self) -> list[tuple[int, str, str]]:
+        # (user_id, chain, address) for every favorite, read in token order via the index
+        await self.flush()
+        return await self._run(lambda: self._conn.execute(
+            "SELECT user_id, chain, address FROM favorites ORDER BY chain, address"
+        ).fetchall())
+
+    async def load_counter(self, name: str) -> int:
+        await self.flush()
+        row = await self._run(lambda: self._conn.execute(
+            "SELECT value FROM counters WHERE name = ?", (name,)
+        ).fetchone())
+        return row[0] if row else 0
+
+STORAGE = Storage()
+
+async def init_storage(app):
+    await STORAGE.start()
+    print(f"✅ Storage ready ({STORAGE.path})")
+
+async def shutdown_storage(app):
+    await STORAGE.close()
+    print("🔒 Storage closed")
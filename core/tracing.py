@@ -0,0 +1,133 @@
+import os
+import time
+import json
+import random
+import cProfile
+import functools
+import contextvars
+from contextlib import contextmanager
+
+# One JSON line per traced scan with the timing of every stage; 0 turns it off
+TRACE_SCANS = os.getenv("TRACE_SCANS", "1") != "0"
+# Fraction of traces that also run under cProfile; the .prof files go to PROFILE_DIR
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+_CURRENT = contextvars.ContextVar("trace", default=None)
+# cProfile hooks the whole event-loop thread, so a sampled profile also covers
+# whatever other handlers ran while that trace was open; one at a time
+_profiling = False
+
+class Trace:
+    __slots__ = ("name", "fields", "start", "spans", "closed")
+
+    def __init__(self, name: str, fields: dict):
+        self.name = name
+        self.fields = fields
+        self.start = time.perf_counter()
+        self.spans = []
+        self.closed = False
+
+    def add(self, stage: str, start: float, end: float, ok: bool):
+        if self.closed:
+            # Shared work (a coalesced render) can outlive the scan that started it
+            return
+        span = {"stage": stage, "at_ms": round((start - self.start) * 1000, 1), "ms": round((end - start) * 1000, 1)}
+        if not ok:
+            span["error"] = True
+        self.spans.append(span)
+
+@contextmanager
+def span(stage: str):
+    """Time a stage of the current trace; a no-op outside one.
+
+    Tasks started inside a trace inherit it, so spans from concurrent work
+    (the screenshot task, gathered fetches) land in the same record. A span
+    belongs to the trace that was current when it started and is dropped if
+    that trace has already been printed.
+    """
+    trace = _CURRENT.get()
+    if trace is None:
+        yield
+        return
+    start, ok = time.perf_counter(), False
+    try:
+        yield
+        ok = True
+    finally:
+        trace.add(stage, start, time.perf_counter(), ok)
+
+async def traced(stage: str, coro):
+    with span(stage):
+        return await coro
+
+def annotate(**fields):
+    # Attach fields (chain, address, outcome...) to the current trace record
+    trace = _CURRENT.get()
+    if trace is not None:
+        trace.fields.update(fields)
+
+def _start_profile():
+    global _profiling
+    if _profiling or PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already attached to this thread
+        return None
+    _profiling = True
+    return profiler
+
+def _stop_profile(profiler, name: str) -> str | None:
+    global _profiling
+    profiler.disable()
+    _profiling = False
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+        profiler.dump_stats(path)
+        return path
+    except OSError as e:
+        print(f"⚠️ Could not write profile: {e}")
+        return None
+
+@contextmanager
+def trace(name: str, **fields):
+    """Collect the spans of one unit of work and print them as a single JSON record."""
+    if not TRACE_SCANS:
+        yield
+        return
+    current = Trace(name, fields)
+    token = _CURRENT.set(current)
+    profiler = _start_profile()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _CURRENT.reset(token)
+        current.closed = True
+        record = {
+            "trace": name,
+            **current.fields,
+            "status": current.fields.get("status", status),
+            "ms": round((time.perf_counter() - current.start) * 1000, 1),
+            "spans": current.spans,
+        }
+        if profiler:
+            record["profile"] = _stop_profile(profiler, name)
+        print(json.dumps(record, default=str), flush=True)
+
+def traced_handler(name: str):
+    """Run an async handler inside trace(name)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with trace(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
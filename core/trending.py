@@ -0,0 +1,104 @@
+import os
+import time
+import heapq
+import asyncio
+from collections import deque
+from telegram.ext import ContextTypes
+from .api_clients import fetch_bubble, fetch_market
+from .extra import GLOBAL_FAVS
+from .ratelimit import background_priority
+
+TRENDING_REFRESH = int(os.getenv("TRENDING_REFRESH", 120))
+TRENDING_CONCURRENCY = int(os.getenv("TRENDING_CONCURRENCY", 4))
+TRENDING_TOP_K = int(os.getenv("TRENDING_TOP_K", 10))
+# Volume change is measured against a stored sample at least this old (seconds)
+TRENDING_CHANGE_WINDOW = int(os.getenv("TRENDING_CHANGE_WINDOW", 3600))
+
+class TrendingIndex:
+    """Market data for every globally favorited token plus precomputed top-K rankings.
+
+    A background job refreshes the entries with bounded concurrency and
+    rebuilds the rankings; readers only look up a ready list.
+    """
+
+    def __init__(self, top_k: int = TRENDING_TOP_K, concurrency: int = TRENDING_CONCURRENCY):
+        self.top_k = top_k
+        self._sem = asyncio.Semaphore(concurrency)
+        # (chain, address) -> {"chain", "address", "name", "vol", "price", "history"}
+        self._entries: dict[tuple[str, str], dict] = {}
+        self.rankings = {"volume": [], "favorites": [], "change": []}
+        self.updated_at = None
+
+    def ranking(self, by: str) -> list[dict]:
+        return self.rankings.get(by, [])
+
+    async def refresh_token(self, chain: str, address: str, rank: bool = True):
+        async with self._sem:
+            try:
+                # Background work: interactive scans go first at the rate limiters
+                with background_priority():
+                    bubble = await fetch_bubble(chain, address)
+                    md = await fetch_market(chain, address)
+            except Exception as e:
+                print(f"⚠️ Trending refresh failed for {chain} {address}: {e!r}")
+                return
+        if not md or (chain, address) not in GLOBAL_FAVS:
+            return
+        old = self._entries.get((chain, address))
+        vol = float(md.get("vol") or 0)
+        # Volume samples, one per market cache period so each is a distinct fetch. The
+        # oldest kept sample is the newest one at least TRENDING_CHANGE_WINDOW old.
+        now = time.time()
+        history = old["history"] if old else deque()
+        if not history or now - history[-1][0] >= fetch_market.ttl:
+            history.append((now, vol))
+        while len(history) > 1 and now - history[1][0] >= TRENDING_CHANGE_WINDOW:
+            history.popleft()
+        self._entries[(chain, address)] = {
+            "chain": chain,
+            "address": address,
+            "name": (bubble or {}).get("full_name", "N/A"),
+            "vol": vol,
+            "price": md.get("price", 0),
+            "history": history,
+        }
+        if rank:
+            self._rank_market()
+            self._rank_favorites()
+
+    async def refresh(self):
+        for key in [k for k in self._entries if k not in GLOBAL_FAVS]:
+            del self._entries[key]
+        await asyncio.gather(*(self.refresh_token(c, a, rank=False) for c, a in list(GLOBAL_FAVS)))
+        self._rank_market()
+        self._rank_favorites()
+        self.updated_at = time.time()
+
+    def on_favorite_change(self, chain: str, address: str):
+        # Favorite counts change in place; volume rankings wait for the next refresh
+        if (chain, address) not in GLOBAL_FAVS:
+            self._entries.pop((chain, address), None)
+            self._rank_market()
+        self._rank_favorites()
+
+    def _rank_market(self):
+        entries = self._entries.values()
+        self.rankings["volume"] = heapq.nlargest(self.top_k, entries, key=lambda e: e["vol"])
+        # Only tokens with a baseline from an earlier fetch; a lone sample has nothing to compare
+        movers = [
+            dict(e, change=(e["vol"] - e["history"][0][1]) / e["history"][0][1] * 100)
+            for e in entries if len(e["history"]) > 1 and e["history"][0][1]
+        ]
+        self.rankings["change"] = heapq.nlargest(self.top_k, movers, key=lambda e: e["change"])
+
+    def _rank_favorites(self):
+        top = heapq.nlargest(self.top_k, GLOBAL_FAVS.items(), key=lambda kv: kv[1])
+        self.rankings["favorites"] = [
+            dict(self._entries.get(k) or {"chain": k[0], "address": k[1], "name": "N/A"}, favs=count)
+            for k, count in top
+        ]
+
+TRENDING = TrendingIndex()
+
+async def refresh_trending(context: ContextTypes.DEFAULT_TYPE):
+    await TRENDING.refresh()
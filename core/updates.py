@@ -0,0 +1,61 @@
+import os
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", 16))
+BROWSER_CONCURRENT_UPDATES = int(os.getenv("BROWSER_CONCURRENT_UPDATES", os.getenv("BROWSER_POOL_SIZE", 3)))
+MAX_PENDING_UPDATES = int(os.getenv("MAX_PENDING_UPDATES", 512))
+
+def is_browser_bound(update: object) -> bool:
+    # Plain-text messages are token scans, which render a map
+    return (
+        isinstance(update, Update) and update.message is not None
+        and bool(update.message.text) and not update.message.text.startswith("/")
+    )
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates from different chats concurrently, each chat's updates in order.
+
+    PTB's own semaphore only bounds how many updates are pending. The
+    concurrency cap is taken after the per-chat lock, so a chat with a backlog
+    doesn't hold slots other chats could use. Scans also take a browser slot
+    first, so slow renders can't occupy every slot.
+    """
+
+    def __init__(self, max_concurrent: int = CONCURRENT_UPDATES,
+                 max_browser: int = BROWSER_CONCURRENT_UPDATES,
+                 max_pending: int = MAX_PENDING_UPDATES):
+        super().__init__(max(max_pending, max_concurrent))
+        self._running = asyncio.Semaphore(max_concurrent)
+        self._browser = asyncio.Semaphore(max_browser)
+        self._chats: dict[int, list] = {}  # chat_id -> [lock, users]
+
+    async def do_process_update(self, update, coroutine):
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            return await self._run(update, coroutine)
+
+        entry = self._chats.setdefault(chat.id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await self._run(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[chat.id]
+
+    async def _run(self, update, coroutine):
+        if is_browser_bound(update):
+            async with self._browser, self._running:
+                await coroutine
+        else:
+            async with self._running:
+                await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,53 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", 2))
+
+_pool: ProcessPoolExecutor | None = None
+
+def _new_pool() -> ProcessPoolExecutor:
+    # The pool starts after PTB (and the storage thread) are up; forking would copy
+    # their locks mid-use, so workers start from a clean forkserver/spawn process
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=WORKER_PROCESSES, mp_context=multiprocessing.get_context(method))
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = _new_pool()
+    return _pool
+
+def _restart_pool(broken: ProcessPoolExecutor):
+    global _pool
+    # Concurrent callers may all see the same broken pool; replace it once
+    if _pool is not broken:
+        return
+    broken.shutdown(wait=False, cancel_futures=True)
+    _pool = _new_pool()
+
+async def run_in_worker(fn, *args):
+    """Run a picklable, module-level ``fn(*args)`` in the worker process pool."""
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    try:
+        return await loop.run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM); start a fresh pool and retry once
+        print("♻️ Worker pool broken, restarting")
+        _restart_pool(pool)
+        return await loop.run_in_executor(get_pool(), fn, *args)
+
+async def init_workers(app):
+    # Start the processes now rather than on the first request
+    await asyncio.gather(*(run_in_worker(os.getpid) for _ in range(WORKER_PROCESSES)))
+    print(f"✅ Worker pool ready ({WORKER_PROCESSES} processes)")
+
+async def shutdown_workers(app):
+    global _pool
+    if _pool:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        print("🔒 Worker pool closed")
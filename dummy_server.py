@@ -1,17 +1,54 @@
 import os
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from aiohttp import web
+from telegram import Update
+from core.metrics import render as render_metrics
 
-class DummyHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.end_headers()
-        self.wfile.write(b'OK')
+PORT = int(os.environ.get("PORT", 10000))
+# Webhook mode is on when WEBHOOK_URL (the public base URL of this service) is set
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
 
-    def do_HEAD(self):
-        self.send_response(200)
-        self.end_headers()
-def run_dummy_server():
-    port = int(os.environ.get("PORT", 10000))
-    server = HTTPServer(('0.0.0.0', port), DummyHandler)
-    print(f"Dummy server running on port {port}")
-    server.serve_forever()
\ No newline at end of file
+async def health(request):
+    return web.Response(text="OK")
+
+async def metrics(request):
+    return web.Response(
+        body=render_metrics().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+def build_web_app(application) -> web.Application:
+    async def telegram_update(request):
+        if WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        update = Update.de_json(data, application.bot)
+        # Swap callback_data UUIDs back to the objects stored by arbitrary_callback_data
+        application.bot.insert_callback_data(update)
+        await application.update_queue.put(update)
+        return web.Response()
+
+    web_app = web.Application()
+    if WEBHOOK_URL:
+        web_app.router.add_post(f"/{WEBHOOK_PATH}", telegram_update)
+    web_app.router.add_get("/metrics", metrics)
+    # Health checks: any GET/HEAD path answers OK
+    web_app.router.add_get("/{tail:.*}", health)
+    return web_app
+
+async def start_http_server(app):
+    # Runs on the bot's event loop, so no separate server thread is needed
+    runner = web.AppRunner(build_web_app(app), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", PORT).start()
+    app.bot_data["http_server"] = runner
+    print(f"Dummy server running on port {PORT}")
+
+async def stop_http_server(app):
+    runner = app.bot_data.pop("http_server", None)
+    if runner:
+        await runner.cleanup()
@@ -2,6 +2,9 @@ import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from core.api_clients import fetch_bubble
+from core.analysis import fetch_analysis
+from core.clusters import fetch_clusters
+from core.metrics import timed
 
 async def tokendetails(update: Update, context: ContextTypes.DEFAULT_TYPE):
     token = context.user_data.get('current_token')
@@ -11,7 +14,8 @@ async def tokendetails(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     chain, address = token['chain'], token['address']
     bubble = await fetch_bubble(chain, address)
-    if not bubble:
+    analysis = await fetch_analysis(chain, address)
+    if not bubble or not analysis:
         await update.message.reply_text("Failed to fetch token details.")
         return
 
@@ -21,8 +25,8 @@ async def tokendetails(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"Chain: {chain.upper()}\n"
         f"Total Supply: {bubble.get('supply', 'N/A')}\n"
         f"NFT: {'Yes' if bubble.get('is_X721') else 'No'}\n"
-        f"Holder Count: {len(bubble.get('nodes', []))}\n"
-        f"Transfer Count: {len(bubble.get('links', []))}\n"
+        f"Holder Count: {analysis.holder_count}\n"
+        f"Transfer Count: {analysis.link_count}\n"
     )
     await update.message.reply_text(message, parse_mode="Markdown")
 
@@ -50,11 +54,12 @@ async def tokendetails(update: Update, context: ContextTypes.DEFAULT_TYPE):
 #     await (update.message.reply_text if update.message else update.callback_query.message.reply_text)(
 #         message, parse_mode="Markdown"
 #     )
-import matplotlib.pyplot as plt
-import io
 from telegram import Update
 from telegram.ext import ContextTypes
+from core.charts import holders_chart
+from core.file_ids import reply_photo_cached, file_id_key
 
+@timed("top_holders")
 async def top_holders(update: Update, context: ContextTypes.DEFAULT_TYPE):
     token = context.user_data.get('current_token')
     if not token:
@@ -65,54 +70,32 @@ async def top_holders(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     chain, address = token['chain'], token['address']
     bubble = await fetch_bubble(chain, address)
-    if not bubble or not bubble.get('nodes'):
+    analysis = await fetch_analysis(chain, address)
+    if not bubble or not analysis or not analysis.holder_count:
         await (update.message.reply_text if update.message else update.callback_query.message.reply_text)(
             "No holder data available."
         )
         return
 
-    nodes = bubble['nodes'][:5]  # Top 5 holders
+    nodes = analysis.holders(5)  # Top 5 holders
     # Text message for top holders
     message = "🏆 **Top Holders** 🏆\n\n" + "\n".join(
         f"{i}. {n['address'][:6]}...{n['address'][-4:]}: {n['percentage']:.2f}%{' (Contract)' if n['is_contract'] else ''}"
         for i, n in enumerate(nodes, 1)
     )
 
-    # Create a bar chart
-    labels = [f"{n['address'][:6]}...{n['address'][-4:]}{' (C)' if n['is_contract'] else ''}" for n in nodes]
-    sizes = [n['percentage'] for n in nodes]
-    colors = ['#ff9999', '#66b3ff', '#99ff99', '#ffcc99', '#c2c2f0']  # Custom colors
-
-    plt.figure(figsize=(10, 6))
-    bars = plt.bar(labels, sizes, color=colors)
-    plt.xlabel("Holders")
-    plt.ylabel("Percentage (%)")
-    plt.title("Top 5 Holders Distribution")
-    plt.xticks(rotation=45, ha='right')
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-
-    # Add percentage labels on top of bars
-    for bar in bars:
-        yval = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2, yval + 0.5, f'{yval:.2f}%', ha='center', va='bottom')
-
-    plt.tight_layout()
-
-    # Save the chart to a bytes buffer
-    img_buffer = io.BytesIO()
-    plt.savefig(img_buffer, format='png', bbox_inches='tight')
-    img_buffer.seek(0)
-    plt.close()
-
     # Send the text message
     await (update.message.reply_text if update.message else update.callback_query.message.reply_text)(
         message, parse_mode="Markdown"
     )
-    # Send the chart image
-    await (update.message.reply_photo if update.message else update.callback_query.message.reply_photo)(
-        photo=img_buffer
+    # Send the chart image, reusing the upload when this map version was charted before
+    await reply_photo_cached(
+        update.message.reply_photo if update.message else update.callback_query.message.reply_photo,
+        file_id_key(chain, address, "holders", bubble.get("dt_update")),
+        lambda: holders_chart(nodes),
     )
 
+@timed("transfers")
 async def transfers(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         token = context.user_data.get('current_token')
@@ -121,26 +104,14 @@ async def transfers(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         chain, address = token['chain'], token['address']
-        bubble = await fetch_bubble(chain, address)
-        if not bubble or not bubble.get('links'):
+        analysis = await fetch_analysis(chain, address)
+        if not analysis or not analysis.link_count:
             await update.callback_query.message.reply_text("No transfer data available.")
             return
 
-        nodes = bubble.get('nodes', [])
-        links = sorted(
-            bubble['links'],
-            key=lambda x: max(float(x.get('forward', 0)), float(x.get('backward', 0))),
-            reverse=True
-        )[:3]  # Top 3 transfers
         message = "💸 **Recent Transfers** 💸\n\n"
-        for i, link in enumerate(links, 1):
-            source_idx = link.get('source')
-            target_idx = link.get('target')
-            if (isinstance(source_idx, int) and isinstance(target_idx, int) and
-                    source_idx < len(nodes) and target_idx < len(nodes)):
-                source_addr = nodes[source_idx].get('address', 'Unknown')
-                target_addr = nodes[target_idx].get('address', 'Unknown')
-                amount = max(float(link.get('forward', 0)), float(link.get('backward', 0)))
+        for i, (source_addr, target_addr, amount) in enumerate(analysis.transfers(3), 1):  # Top 3 transfers
+            if source_addr is not None:
                 message += f"{i}. {source_addr[:6]}... → {target_addr[:6]}...: {amount:.2f} tokens\n"
             else:
                 message += f"{i}. Invalid transfer data\n"
@@ -156,14 +127,13 @@ async def risk_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     chain, address = token['chain'], token['address']
-    bubble = await fetch_bubble(chain, address)
-    if not bubble:
+    analysis = await fetch_analysis(chain, address)
+    if not analysis:
         await update.callback_query.message.reply_text("Failed to fetch risk data.")
         return
 
-    nodes = bubble.get('nodes', [])
-    top_10_percent = sum(n['percentage'] for n in nodes[:10]) if nodes else 0
-    contract_percent = sum(n['percentage'] for n in nodes if n.get('is_contract')) if nodes else 0
+    top_10_percent = analysis.top10_share
+    contract_percent = analysis.contract_share
     message = (
         "⚠️ **Risk Analysis** ⚠️\n\n"
         f"Top 10 Holders Ownership: {top_10_percent:.2f}%\n"
@@ -172,6 +142,33 @@ async def risk_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     await update.callback_query.message.reply_text(message, parse_mode="Markdown")
 
+async def clusters(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    token = context.user_data.get('current_token')
+    if not token:
+        await update.callback_query.message.reply_text("No token selected. Please input a <chain> <address> first.")
+        return
+
+    chain, address = token['chain'], token['address']
+    summary = await fetch_clusters(chain, address)
+    if not summary:
+        await update.callback_query.message.reply_text("Failed to fetch cluster data.")
+        return
+    if not summary.cluster_count:
+        await update.callback_query.message.reply_text("No connected wallet clusters found.")
+        return
+
+    message = (
+        "🫧 **Holder Clusters** 🫧\n\n"
+        f"Clusters: {summary.cluster_count}\n"
+        f"Supply in Clusters: {summary.clustered_share:.2f}%\n"
+        f"Largest Cluster: {summary.largest_size} wallets, {summary.largest_share:.2f}%\n\n"
+        + "\n".join(
+            f"{i}. {size} wallets: {share:.2f}%"
+            for i, (size, share) in enumerate(summary.top(5), 1)
+        )
+    )
+    await update.callback_query.message.reply_text(message, parse_mode="Markdown")
+
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -181,6 +178,8 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await transfers(update, context)
     elif query.data == 'risk_analysis':
         await risk_analysis(update, context)
+    elif query.data == 'clusters':
+        await clusters(update, context)
     elif query.data == 'related_tokens':
         await related_tokens(update, context)
     elif query.data == 'cancel':
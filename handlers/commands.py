@@ -1,7 +1,7 @@
 import os
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
 from telegram.ext import ContextTypes
-from core.api_clients import fetch_bubble, fetch_meta, fetch_market
+from core.api_clients import fetch_meta
 from core.playwright_sceenshot import generate_screenshot
 from core.extra import (
     update_global_on_add,
@@ -9,11 +9,25 @@ from core.extra import (
     get_stats,
     GLOBAL_FAVS,
 )
+from core.storage import STORAGE
+from core.metrics import timed
+from handlers.typos_and_messages import unsupported_chain_text
+from core.trending import TRENDING
+from core.alerts import ALERTS
 
 # which chains we support
 SUPPORTED_CHAINS = {"eth", "bsc", "ftm", "avax", "cro", "arbi", "poly", "base", "sol"}
 
 
+async def get_favorites(update: Update, context: ContextTypes.DEFAULT_TYPE) -> list:
+    # Loaded from the database on first use per user, then served from user_data
+    favorites = context.user_data.get("favorites")
+    if favorites is None:
+        favorites = await STORAGE.load_favorites(update.effective_user.id)
+        context.user_data["favorites"] = favorites
+    return favorites
+
+
 async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "🚀 Welcome to BubbleMaps Bot! 🚀\n\n"
@@ -42,7 +56,7 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• /addfavorite <chain> <address> - Add a token to your watchlist\n"
         "• /favorites - List your saved tokens\n"
         "• /removefavorite <chain> <address> - Remove a token from favorites\n"
-        "• /trending - See top trending tokens by volume\n"
+        "• /trending [volume|favorites|change] - See top trending tokens\n"
         "• /stats - Check bot statistics\n"
         "• /relatedtokens - View tokens related to the current token",
         parse_mode="Markdown"
@@ -57,25 +71,28 @@ async def add_favorite(update: Update, context: ContextTypes.DEFAULT_TYPE):
     _, chain, address = parts
     chain = chain.lower()
     if chain not in SUPPORTED_CHAINS:
-        return await update.message.reply_text(f"Unsupported chain. Supported: {', '.join(SUPPORTED_CHAINS)}")
+        return await update.message.reply_text(unsupported_chain_text(chain))
 
     # simple EVM‐style check for non‐Solana chains
     if chain != "sol" and not (address.startswith("0x") and len(address) == 42):
         return await update.message.reply_text("Invalid address format for this chain.")
 
-    favorites = context.user_data.get("favorites", [])
+    favorites = await get_favorites(update, context)
     token = {"chain": chain, "address": address}
     if token in favorites:
         return await update.message.reply_text("Token is already in your favorites.")
 
     favorites.append(token)
-    context.user_data["favorites"] = favorites
     update_global_on_add(chain, address)
+    STORAGE.add_favorite(update.effective_user.id, chain, address)
+    ALERTS.subscribe(update.effective_user.id, chain, address)
+    TRENDING.on_favorite_change(chain, address)
+    context.application.create_task(TRENDING.refresh_token(chain, address))
     await update.message.reply_text("Token added to favorites! ❤️")
 
 
 async def list_favorites(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    favorites = context.user_data.get("favorites", [])
+    favorites = await get_favorites(update, context)
     if not favorites:
         return await update.message.reply_text("You have no favorite tokens. Use /addfavorite to add one. 🤍")
 
@@ -95,51 +112,68 @@ async def remove_favorite(update: Update, context: ContextTypes.DEFAULT_TYPE):
     _, chain, address = parts
     chain = chain.lower()
     if chain not in SUPPORTED_CHAINS:
-        return await update.message.reply_text(f"Unsupported chain. Supported: {', '.join(SUPPORTED_CHAINS)}")
+        return await update.message.reply_text(unsupported_chain_text(chain))
 
     if chain != "sol" and not (address.startswith("0x") and len(address) == 42):
         return await update.message.reply_text("Invalid address format for this chain.")
 
-    favorites = context.user_data.get("favorites", [])
+    favorites = await get_favorites(update, context)
     token = {"chain": chain, "address": address}
     if token not in favorites:
         return await update.message.reply_text("Token not found in your favorites.")
 
     favorites.remove(token)
-    context.user_data["favorites"] = favorites
     update_global_on_remove(chain, address)
+    STORAGE.remove_favorite(update.effective_user.id, chain, address)
+    ALERTS.unsubscribe(update.effective_user.id, chain, address)
+    TRENDING.on_favorite_change(chain, address)
     await update.message.reply_text("Token removed from your favorites. 💔")
 
 
+TRENDING_MODES = {
+    "volume": "volume", "vol": "volume",
+    "favorites": "favorites", "favs": "favorites", "fav": "favorites",
+    "change": "change", "movers": "change",
+}
+
+
+@timed("trending")
 async def trending(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not GLOBAL_FAVS:
         return await update.message.reply_text(
             "No tokens in global favorites yet. Add some tokens to watch the trending list! 🔥"
         )
 
-# bubble = await fetch_bubble(chain, address)
-# name = bubble.get("full_name", "N/A")
-    data = []
-    for (chain, addr), _count in GLOBAL_FAVS.items():
-        bubble = await fetch_bubble(chain, addr)
-        name = bubble.get("full_name", "N/A")
-        md = await fetch_market(chain, addr)
-        if md:
-            data.append({"chain": chain, "name":name, "address": addr, "vol": md.get("vol", 0), "price": md.get("price", 0)})
+    mode = TRENDING_MODES.get(context.args[0].lower() if context.args else "volume")
+    if not mode:
+        return await update.message.reply_text("Usage: /trending [volume|favorites|change]")
 
+    data = TRENDING.ranking(mode)
     if not data:
+        if TRENDING.updated_at is None:
+            return await update.message.reply_text("Trending data is still loading, try again in a minute. ⏳")
         return await update.message.reply_text("No valid market data available for trending tokens.")
 
-    data.sort(key=lambda x: float(x["vol"] or 0), reverse=True)
-    lines = ["🔥 **Trending Tokens (by volume)** 🔥"]
+    titles = {
+        "volume": "🔥 **Trending Tokens (by volume)** 🔥",
+        "favorites": "❤️ **Trending Tokens (by favorites)** ❤️",
+        "change": "📈 **Trending Tokens (by volume change)** 📈",
+    }
+    lines = [titles[mode]]
     for i, t in enumerate(data[:5], start=1):
         url = f"https://app.bubblemaps.io/{t['chain']}/token/{t['address']}"
-        lines.append(f"{i}. {t['chain'].upper()} -{t['name']}– Volume: ${t['vol']} – Price: ${t['price']} – [View Map]({url})")
+        if mode == "favorites":
+            detail = f"Favorites: {t['favs']}"
+        elif mode == "change":
+            detail = f"Volume change: {t['change']:+.1f}% – Volume: ${t['vol']}"
+        else:
+            detail = f"Volume: ${t['vol']} – Price: ${t['price']}"
+        lines.append(f"{i}. {t['chain'].upper()} -{t['name']}– {detail} – [View Map]({url})")
 
     await update.message.reply_text("\n".join(lines), parse_mode="Markdown")
 
 
 async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    favs = context.user_data.get("favorites", [])
+    favs = await get_favorites(update, context)
     msg = get_stats(favs)
     await update.message.reply_text(msg, parse_mode="Markdown")
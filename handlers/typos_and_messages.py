@@ -1,13 +1,19 @@
 # handlers/typos_and_messages.py
 
+import asyncio
 import logging
 import os
-from difflib import get_close_matches
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 from core.api_clients import fetch_bubble, fetch_meta, fetch_market
+from core.analysis import fetch_analysis
+from core.metrics import timed
+from core.tracing import traced_handler, traced, span, annotate
 from core.playwright_sceenshot import generate_screenshot
+from core.render_cache import RENDER_CACHE_TTL
+from core.file_ids import reply_photo_cached, file_id_key
 from core.extra import increment_scans, compute_risk
+from core.fuzzy import FuzzyMatcher
 
 # simple typo‐to‐command map
 CMD_SUGGEST = {
@@ -63,6 +69,21 @@ CMD_SUGGEST = {
 
 SUPPORTED_CHAINS = {"eth", "bsc", "ftm", "avax", "cro", "arbi", "poly", "base", "sol"}
 
+# Built once; same suggestions as difflib.get_close_matches at these cutoffs.
+# Chain names are only 3-4 letters, so one wrong letter needs a lower cutoff.
+COMMAND_MATCHER = FuzzyMatcher(CMD_SUGGEST, cutoff=0.7)
+CHAIN_MATCHER = FuzzyMatcher(sorted(SUPPORTED_CHAINS), cutoff=0.6)
+
+# How long a scan waits for secondary data before showing N/A
+META_TIMEOUT = float(os.getenv("SCAN_META_TIMEOUT", 10))
+MARKET_TIMEOUT = float(os.getenv("SCAN_MARKET_TIMEOUT", 6))
+
+
+def unsupported_chain_text(chain: str) -> str:
+    text = f"Unsupported chain. Supported: {', '.join(SUPPORTED_CHAINS)}"
+    match = CHAIN_MATCHER.match(chain)
+    return f"{text}\nDid you mean {match[0]}?" if match else text
+
 
 def validate_address(chain: str, address: str) -> bool:
     if chain in {"eth", "bsc", "ftm", "avax", "cro", "arbi", "poly", "base"}:
@@ -75,7 +96,7 @@ async def handle_typos(update: Update, context: ContextTypes.DEFAULT_TYPE):
     cmd = text.lower().split()[0]
     if cmd.startswith("/"):
         cmd = cmd[1:]
-    match = get_close_matches(cmd, CMD_SUGGEST.keys(), n=1, cutoff=0.7)
+    match = COMMAND_MATCHER.match(cmd)
     if match:
         suggestion = CMD_SUGGEST[match[0]]
         await update.message.reply_text(
@@ -89,8 +110,21 @@ async def handle_typos(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("🤖 I don't recognize that command. Type `/start` to see available commands.")
 
 
+async def _optional(coro, timeout: float):
+    # Secondary data must not hold up the scan: give up after `timeout` and show N/A
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except Exception as e:
+        logging.warning(f"Optional scan data unavailable: {e!r}")
+        return None
+
+
+@timed("scan")
+@traced_handler("scan")
 async def handle_contract_address(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    loading_message = await update.message.reply_text("⏳ Loading bubblemap with token details...")
+    with span("loading_message"):
+        loading_message = await update.message.reply_text("⏳ Loading bubblemap with token details...")
+    screenshot_task = None
     try:
         text = update.message.text.strip().split()
         if len(text) != 2:
@@ -98,79 +132,64 @@ async def handle_contract_address(update: Update, context: ContextTypes.DEFAULT_
             return
         chain, address = text
         chain = chain.lower()
+        annotate(chain=chain, address=address)
         if chain not in SUPPORTED_CHAINS:
-            await update.message.reply_text(f"Unsupported chain. Supported: {', '.join(SUPPORTED_CHAINS)}")
+            annotate(status="unsupported_chain")
+            await update.message.reply_text(unsupported_chain_text(chain))
             return
 
-        bubble = await fetch_bubble(chain, address)
-        meta = await fetch_meta(chain, address)
-        market = await fetch_market(chain, address)
-        if not bubble or not meta or not market:
+        # Start the browser render right away and fetch all token data alongside it
+        screenshot_task = asyncio.create_task(generate_screenshot(chain, address, context))
+        analysis, meta, market = await asyncio.gather(
+            traced("fetch_analysis", fetch_analysis(chain, address)),
+            _optional(traced("fetch_meta", fetch_meta(chain, address)), META_TIMEOUT),
+            _optional(traced("fetch_market", fetch_market(chain, address)), MARKET_TIMEOUT),
+        )
+        bubble = await fetch_bubble(chain, address)  # already cached by fetch_analysis
+        if not bubble or not analysis:
+            annotate(status="no_data")
             await update.message.reply_text("Failed to fetch token data.")
             return
-        
 
         # Store token context
         context.user_data['current_token'] = {'chain': chain, 'address': address}
 
         # Top holders (top 3 for brevity)
-        nodes = bubble.get('nodes', [])
         top_holders_text = "🏆 **Top Holders** 🏆\n" + (
             "\n".join(
                 f"{i}. {n['address'][:6]}...{n['address'][-4:]}: {n['percentage']:.2f}%{' (Contract)' if n['is_contract'] else ''}"
-                for i, n in enumerate(nodes[:3], 1)
-            ) if nodes else "No holder data available."
+                for i, n in enumerate(analysis.holders(3), 1)
+            ) if analysis.holder_count else "No holder data available."
         )
 
         # Largest transfer (from links)
-        links = bubble.get('links', [])
         transfer_text = "💸 **Largest Transfer**: None\n"
-        if links and nodes:
-            # Find the link with the largest transfer amount (forward or backward)
-            largest_transfer = max(
-                links,
-                key=lambda x: max(float(x.get('forward', 0)), float(x.get('backward', 0))),
-                default=None
-            )
-            if largest_transfer:
-                source_idx = largest_transfer.get('source')
-                target_idx = largest_transfer.get('target')
-                # Ensure indices are valid
-                if (isinstance(source_idx, int) and isinstance(target_idx, int) and
-                        source_idx < len(nodes) and target_idx < len(nodes)):
-                    source_addr = nodes[source_idx]['address']
-                    target_addr = nodes[target_idx]['address']
-                    amount = max(float(largest_transfer.get('forward', 0)), float(largest_transfer.get('backward', 0)))
-                    transfer_text = (
-                        f"💸 **Largest Transfer**: {source_addr[:6]}... → {target_addr[:6]}... "
-                        f"({amount:.2f} tokens)\n"
-                    )
-
-            screenshot = await generate_screenshot(chain, address, context)  
-            if not screenshot:
-                return await update.message.reply_text("Failed to generate map.")  
-
-                # build caption
-            name = bubble.get("full_name", "N/A")
-            sym = bubble.get("symbol", "N/A")
-            score = meta.get("score", "N/A")
-            cex_pct = meta.get("cex", "N/A")
-            contract_pct = meta.get("contract", "N/A")
-            price = market.get("price", "N/A") if market else "N/A"
-            cap = market.get("cap", "N/A") if market else "N/A"
-            vol = market.get("vol", "N/A") if market else "N/A"  
-
-                # compute risk
-            try:
-                _score = float(score)
-                _vol = float(vol)
-                _cex = float(cex_pct)
-                _contract = float(contract_pct)
-            except Exception:
-                _score = _vol = _cex = _contract = 0
-            risk = compute_risk(_score, _vol, _cex, _contract)
-
-            caption = (
+        if analysis.link_count and analysis.holder_count:
+            source_addr, target_addr, amount = analysis.transfers(1)[0]
+            if source_addr is not None:
+                transfer_text = (
+                    f"💸 **Largest Transfer**: {source_addr[:6]}... → {target_addr[:6]}... "
+                    f"({amount:.2f} tokens)\n"
+                )
+
+        # build caption
+        name = bubble.get("full_name", "N/A")
+        sym = bubble.get("symbol", "N/A")
+        score = meta.get("score", "N/A") if meta else "N/A"
+        cex_pct = meta.get("cex", "N/A") if meta else "N/A"
+        contract_pct = meta.get("contract", "N/A") if meta else "N/A"
+        price = market.get("price", "N/A") if market else "N/A"
+        cap = market.get("cap", "N/A") if market else "N/A"
+        vol = market.get("vol", "N/A") if market else "N/A"
+
+        # compute risk; missing market data only drops the liquidity factor
+        try:
+            _vol = float(vol) if market else 0
+            risk = compute_risk(float(score), _vol, float(cex_pct), float(contract_pct))
+        except (TypeError, ValueError):
+            risk = "N/A"
+
+        caption = (
             f"🔍 **SUPPLY ANALYSIS** 🔍\n\n"
             f"**Token**: {name} ({sym}) 💎\n"
             f"**Chain**: {chain.upper()} 🔗\n"
@@ -182,7 +201,7 @@ async def handle_contract_address(update: Update, context: ContextTypes.DEFAULT_
             f"**Risk Level**: {risk}\n"
             f"{top_holders_text}\n\n"
             f"{transfer_text}"
-            )
+        )
 
         url = f"https://app.bubblemaps.io/{chain}/token/{address}"
         keyboard = [
@@ -191,24 +210,65 @@ async def handle_contract_address(update: Update, context: ContextTypes.DEFAULT_
                 InlineKeyboardButton("Top Holders", callback_data='top_holders'),
                 InlineKeyboardButton("Recent Transfers", callback_data='transfers'),
                 InlineKeyboardButton("Risk Analysis", callback_data='risk_analysis'),
+                InlineKeyboardButton("Clusters", callback_data='clusters'),
                 InlineKeyboardButton("Related Tokens", callback_data='related_tokens')
             ],
             [InlineKeyboardButton("Cancel", callback_data='cancel')]
         ]
-        with open(screenshot, "rb") as img:
-            await loading_message.delete()
-            await update.message.reply_photo(
-                photo=img,
-                caption=caption,
-                parse_mode="Markdown",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
-        os.remove(screenshot)
+
+        dismissed = fallback = False
+
+        async def dismiss_loading():
+            # "⏳ Loading" stays up until there is something to send in its place
+            nonlocal dismissed
+            if not dismissed:
+                dismissed = True
+                with span("delete_loading"):
+                    await loading_message.delete()
+
+        async def render():
+            nonlocal fallback
+            photo = None
+            try:
+                with span("render_wait"):
+                    photo, fallback = await screenshot_task
+            except Exception as e:
+                logging.error(f"Screenshot failed for {chain} {address}: {e!r}")
+            await dismiss_loading()
+            return photo
+
+        # A map we already uploaded for this data version goes out by file_id, no upload
+        sent = await reply_photo_cached(
+            update.message.reply_photo,
+            file_id_key(chain, address, "map", bubble.get("dt_update")),
+            render,
+            ttl=RENDER_CACHE_TTL,
+            before_send=dismiss_loading,
+            # A native stand-in for a failed browser render; resending it would skip the retry
+            cacheable=lambda: not fallback,
+            caption=caption,
+            parse_mode="Markdown",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+        annotate(outcome="photo" if sent else "text")
+        if not sent:
+            # The map is the slow part; still deliver the analysis without it
+            await dismiss_loading()
+            with span("send_text"):
+                await update.message.reply_text(
+                    "⚠️ Failed to generate map.\n\n" + caption,
+                    parse_mode="Markdown",
+                    reply_markup=InlineKeyboardMarkup(keyboard),
+                )
         increment_scans()
 
     except Exception as e:
+        annotate(status="error", error=repr(e))
         await update.message.reply_text("An error occurred while processing your request. Please try again later.")
         logging.error(f"Error in handle_contract_address: {str(e)}", exc_info=True)
+    finally:
+        if screenshot_task and not screenshot_task.done():
+            screenshot_task.cancel()
 
 
     # # screenshot
@@ -0,0 +1,70 @@
+import asyncio
+from core.alerts import AlertEngine
+
+def snapshot(holders, top, score=50):
+    return {"price": 1, "vol": 1, "score": score, "holders": holders,
+            "floor": min(holders.values(), default=0.0), "top": top}
+
+def test_wallet_entering_top_is_diffed_against_its_previous_share():
+    old = snapshot({"0xaaaaaaaaaa": 10.0, "0xbbbbbbbbbb": 4.0, "0xcccccccccc": 3.5}, ["0xaaaaaaaaaa", "0xbbbbbbbbbb"])
+    new = snapshot({"0xaaaaaaaaaa": 10.0, "0xbbbbbbbbbb": 3.0, "0xcccccccccc": 4.0}, ["0xaaaaaaaaaa", "0xcccccccccc"])
+    assert AlertEngine.diff(old, new) == []
+
+def test_wallet_leaving_the_map_is_reported():
+    old = snapshot({"0xaaaaaaaaaa": 10.0, "0xbbbbbbbbbb": 1.0}, ["0xaaaaaaaaaa", "0xbbbbbbbbbb"])
+    new = snapshot({"0xbbbbbbbbbb": 1.0}, ["0xbbbbbbbbbb"])
+    assert AlertEngine.diff(old, new) == ["Holder 0xaaaa...aaaa left the map (was 10.00%)"]
+
+def test_bad_snapshot_does_not_abort_the_tick():
+    engine = AlertEngine()
+    good, bad = ("eth", "0xgood"), ("eth", "0xbad")
+    engine.snapshots[bad] = snapshot({}, [], score="n/a")
+    engine.snapshots[good] = snapshot({}, [], score=50)
+
+    async def fake_snapshot(chain, address):
+        return snapshot({}, [], score=90)
+    engine._snapshot = fake_snapshot
+    notified = []
+
+    async def fake_notify(bot, token, changes):
+        notified.append(token)
+    engine._notify = fake_notify
+
+    async def main():
+        await asyncio.gather(engine._check(None, bad), engine._check(None, good))
+
+    asyncio.run(main())
+    assert notified == [good]
+
+def test_failed_fetch_keeps_the_last_good_snapshot(monkeypatch):
+    from core import alerts
+    from core.analysis import TokenAnalysis
+    bubble = {"nodes": [{"address": f"0x{c * 10}", "percentage": p} for c, p in zip("abcdef", (20, 10, 8, 6, 5, 1))]}
+    responses = [
+        ({"price": 1.0, "vol": 100.0}, {"score": 50}, TokenAnalysis(bubble)),
+        (None, None, None),
+        ({"price": 1.5, "vol": 100.0}, {"score": 50}, TokenAnalysis(bubble)),
+    ]
+    current = {}
+
+    async def fetch(name):
+        return current[name]
+
+    monkeypatch.setattr(alerts, "fetch_market", lambda c, a: fetch("market"))
+    monkeypatch.setattr(alerts, "fetch_meta", lambda c, a: fetch("meta"))
+    monkeypatch.setattr(alerts, "fetch_analysis", lambda c, a: fetch("analysis"))
+    engine = AlertEngine()
+    notified = []
+
+    async def fake_notify(bot, token, changes):
+        notified.append(changes)
+    engine._notify = fake_notify
+
+    async def main():
+        for market, meta, analysis in responses:
+            current.update(market=market, meta=meta, analysis=analysis)
+            await engine._check(None, ("eth", "0xtoken"))
+
+    asyncio.run(main())
+    # Only the price move that spans the outage is reported
+    assert notified == [["Price +50.0% ($1.5)"]]
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from core.cache import coalesce, INFLIGHT, WAITERS
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        results = await asyncio.gather(
+            *(coalesce("failing", failing) for _ in range(3)), return_exceptions=True
+        )
+        assert "failing" not in INFLIGHT
+        # The next call runs again instead of replaying the error
+        with pytest.raises(ValueError):
+            await coalesce("failing", failing)
+        return results
+
+    results = run(main())
+    assert [type(r) for r in results] == [ValueError] * 3
+    assert len(calls) == 2
+
+def test_shared_call_is_cancelled_once_no_waiters_remain():
+    async def main():
+        never = asyncio.Event()
+        waiters = [asyncio.create_task(coalesce("orphan", never.wait, cancel_orphaned=True)) for _ in range(2)]
+        await asyncio.sleep(0)
+        shared = INFLIGHT["orphan"]
+
+        waiters[0].cancel()
+        await asyncio.sleep(0)
+        assert not shared.cancelled() and WAITERS[shared] == 1
+
+        waiters[1].cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert shared.cancelled()
+        assert "orphan" not in INFLIGHT and shared not in WAITERS
+
+    run(main())
+
+def test_shared_call_outlives_its_waiters_by_default():
+    async def main():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "done"
+
+        waiter = asyncio.create_task(coalesce("kept", slow))
+        await asyncio.sleep(0)
+        shared = INFLIGHT["kept"]
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        release.set()
+        assert await shared == "done"
+
+    run(main())
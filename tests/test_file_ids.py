@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+from core.file_ids import FILE_IDS, reply_photo_cached
+
+def test_before_send_runs_only_ahead_of_a_file_id_resend():
+    events = []
+
+    async def reply_photo(photo, **kwargs):
+        events.append(("send", photo))
+        return SimpleNamespace(photo=[SimpleNamespace(file_id="file-1")])
+
+    async def render():
+        events.append(("render", None))
+        return b"png"
+
+    async def before_send():
+        events.append(("ready", None))
+
+    async def main():
+        key = ("eth", "0xbefore-send", "map", 1)
+        await reply_photo_cached(reply_photo, key, render, before_send=before_send)
+        await reply_photo_cached(reply_photo, key, render, before_send=before_send)
+        FILE_IDS.pop(key)
+
+    asyncio.run(main())
+    assert events == [("render", None), ("send", b"png"), ("ready", None), ("send", "file-1")]
+
+def test_uncacheable_render_is_not_resent_by_file_id():
+    renders = []
+
+    async def reply_photo(photo, **kwargs):
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=f"file-{len(renders)}")])
+
+    async def render():
+        renders.append(1)
+        return b"fallback"
+
+    async def main():
+        key = ("eth", "0xfallback", "map", 1)
+        for _ in range(2):
+            await reply_photo_cached(reply_photo, key, render, cacheable=lambda: False)
+        assert FILE_IDS.get(key) is None
+
+    asyncio.run(main())
+    assert len(renders) == 2
@@ -0,0 +1,19 @@
+import random
+import string
+import difflib
+from core.fuzzy import FuzzyMatcher
+from handlers.typos_and_messages import CMD_SUGGEST
+
+def test_matches_get_close_matches_exactly():
+    words = list(dict.fromkeys(CMD_SUGGEST)) + ["", "a", "ab", "ba"]
+    rng = random.Random(7)
+    queries = ["", "a", "hepl", "trendnig", "addfavorit"]
+    for _ in range(300):
+        w = list(rng.choice(words) or "x")
+        w[rng.randrange(len(w))] = rng.choice(string.ascii_lowercase)
+        queries.append("".join(w))
+    for cutoff in (0.0, 0.6, 0.7, 0.8):
+        matcher = FuzzyMatcher(words, cutoff=cutoff)
+        for q in queries:
+            for n in (1, 3):
+                assert matcher.match(q, n) == difflib.get_close_matches(q, words, n, cutoff), (q, n, cutoff)
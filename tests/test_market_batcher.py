@@ -0,0 +1,63 @@
+import asyncio
+from core import api_clients
+from core.api_clients import MarketBatcher
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 2))
+
+def test_malformed_payload_resolves_every_caller(monkeypatch):
+    async def fake_get_json(url, project=None):
+        return [{"unexpected": "shape"}]
+    monkeypatch.setattr(api_clients, "get_json", fake_get_json)
+
+    async def main():
+        batcher = MarketBatcher(window=0.01, max_batch=10)
+        return await asyncio.gather(batcher.get("ethereum", "0xa"), batcher.get("ethereum", "0xb"))
+
+    assert run(main()) == [None, None]
+
+def test_error_in_fan_out_reaches_callers(monkeypatch):
+    class Exploding(dict):
+        def get(self, key, default=None):
+            raise RuntimeError("boom")
+
+    async def exploding_request(self, plat, addrs):
+        return Exploding()
+    monkeypatch.setattr(MarketBatcher, "_request", exploding_request)
+
+    async def main():
+        batcher = MarketBatcher(window=0.01, max_batch=10)
+        return await asyncio.gather(batcher.get("ethereum", "0xa"), return_exceptions=True)
+
+    [result] = run(main())
+    assert isinstance(result, RuntimeError)
+
+def test_rejected_batch_falls_back_to_single_contracts(monkeypatch):
+    calls = []
+
+    async def fake_get_json(url, project=None):
+        addrs = url.split("contract_addresses=")[1].split("&")[0].split(",")
+        calls.append(addrs)
+        if len(addrs) > 1:
+            return None
+        return {addrs[0]: {"usd": 2.0, "usd_24h_vol": 3.0, "usd_market_cap": 4.0}}
+    monkeypatch.setattr(api_clients, "get_json", fake_get_json)
+
+    async def main():
+        batcher = MarketBatcher(window=0.01, max_batch=10)
+        return await asyncio.gather(batcher.get("ethereum", "0xa"), batcher.get("ethereum", "0xb"))
+
+    assert run(main()) == [{"price": 2.0, "vol": 3.0, "cap": 4.0}] * 2
+    assert sorted(calls, key=len) == [["0xa"], ["0xb"], ["0xa", "0xb"]]
+
+def test_none_market_result_is_not_cached(monkeypatch):
+    results = iter([None, {"price": 1, "vol": 2, "cap": 3}])
+
+    async def fake_get(self, plat, addr):
+        return next(results)
+    monkeypatch.setattr(MarketBatcher, "get", fake_get)
+
+    async def main():
+        return [await api_clients.fetch_market("eth", "0xnotcached"), await api_clients.fetch_market("eth", "0xnotcached")]
+
+    assert run(main()) == [None, {"price": 1, "vol": 2, "cap": 3}]
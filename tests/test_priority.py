@@ -0,0 +1,77 @@
+import asyncio
+from core import api_clients
+from core.cache import single_flight
+from core.ratelimit import TokenBucket, background_priority, PRIORITY_INTERACTIVE
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+def test_interactive_follower_promotes_background_fetch():
+    async def main():
+        bucket = TokenBucket(rate=20, burst=1)
+        await bucket.acquire()  # drain the burst so every call below queues
+        order = []
+
+        @single_flight()
+        async def fetch(name):
+            await bucket.acquire()
+            order.append(name)
+
+        async def other(name):
+            await bucket.acquire()
+            order.append(name)
+
+        async def background():
+            with background_priority():
+                await fetch("shared")
+
+        leader = asyncio.create_task(background())
+        for _ in range(3):
+            await asyncio.sleep(0)  # let the shared call queue at background priority
+        # An interactive caller joins it; interactive calls arriving later must not overtake it
+        follower = asyncio.create_task(fetch("shared"))
+        await asyncio.sleep(0)
+        later = [asyncio.create_task(other(f"interactive-{i}")) for i in range(2)]
+        await asyncio.gather(leader, follower, *later)
+        return order
+
+    assert run(main()) == ["shared", "interactive-0", "interactive-1"]
+
+def test_background_fetch_without_followers_keeps_its_priority():
+    async def main():
+        bucket = TokenBucket(rate=20, burst=1)
+        await bucket.acquire()
+        order = []
+
+        @single_flight()
+        async def fetch(name):
+            await bucket.acquire()
+            order.append(name)
+
+        async def other(name):
+            await bucket.acquire()
+            order.append(name)
+
+        async def background():
+            with background_priority():
+                await fetch("shared")
+
+        leader = asyncio.create_task(background())
+        await asyncio.sleep(0)
+        await asyncio.gather(leader, other("interactive"))
+        return order
+
+    assert run(main()) == ["interactive", "shared"]
+
+def test_exhausted_retries_are_not_cached(monkeypatch):
+    responses = iter([None, {"full_name": "Token", "nodes": [], "links": []}])
+
+    async def fake_get_json(url, project=None):
+        return next(responses)
+    monkeypatch.setattr(api_clients, "get_json", fake_get_json)
+
+    async def main():
+        return [await api_clients.fetch_bubble("eth", "0xretry"), await api_clients.fetch_bubble("eth", "0xretry")]
+
+    first, second = run(main())
+    assert first is None and second["full_name"] == "Token"
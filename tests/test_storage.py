@@ -0,0 +1,70 @@
+import time
+import asyncio
+import sqlite3
+import pytest
+from core import storage
+from core.storage import Storage
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+def rows(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+def test_writes_are_flushed_behind_the_handler(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_FLUSH_INTERVAL", 0.05)
+    path = str(tmp_path / "bot.db")
+
+    async def main():
+        store = Storage(path)
+        await store.start()
+        try:
+            store.add_favorite(1, "eth", "0xabc")
+            store.increment("scans", 2)
+            store.increment("scans")
+            # Queued in memory, nothing written yet
+            assert rows(path, "SELECT * FROM favorites") == []
+            await asyncio.sleep(0.2)
+            assert rows(path, "SELECT user_id, chain, address FROM favorites") == [(1, "eth", "0xabc")]
+            assert rows(path, "SELECT count FROM global_favorites") == [(1,)]
+            assert rows(path, "SELECT value FROM counters WHERE name = 'scans'") == [(3,)]
+        finally:
+            await store.close()
+
+    run(main())
+
+def test_failed_flush_requeues_the_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_FLUSH_INTERVAL", 60)
+
+    async def main():
+        store = Storage(str(tmp_path / "bot.db"))
+        await store.start()
+        try:
+            store.add_favorite(1, "eth", "0xabc")
+            store.increment("scans")
+            write = store._write
+
+            def broken(ops, counters):
+                time.sleep(0.05)
+                raise sqlite3.OperationalError("database is locked")
+            store._write = broken
+            flush = asyncio.create_task(store.flush())
+            await asyncio.sleep(0.01)
+            # Queued while the failing batch is out; must still apply after it
+            store.remove_favorite(1, "eth", "0xabc")
+            store.increment("scans")
+            with pytest.raises(sqlite3.OperationalError):
+                await flush
+
+            store._write = write
+            assert await store.load_favorites(1) == []
+            assert await store.load_global_favorites() == {}
+            assert await store.load_counter("scans") == 2
+        finally:
+            await store.close()
+
+    run(main())
@@ -0,0 +1,25 @@
+import json
+import asyncio
+from core import tracing
+
+def test_spans_after_the_trace_is_printed_are_dropped(monkeypatch, capsys):
+    monkeypatch.setattr(tracing, "TRACE_SCANS", True)
+    release = asyncio.Event()
+
+    async def shared_work():
+        with tracing.span("early"):
+            pass
+        await release.wait()
+        with tracing.span("late"):
+            pass
+
+    async def main():
+        with tracing.trace("scan"):
+            task = asyncio.create_task(shared_work())
+            await asyncio.sleep(0)
+        release.set()
+        await task
+
+    asyncio.run(main())
+    record = json.loads(capsys.readouterr().out.strip())
+    assert [s["stage"] for s in record["spans"]] == ["early"]
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+import pytest
+from core import cache
+from core.cache import TTLCache, approx_size
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def test_least_recently_used_entry_is_evicted(clock):
+    c = TTLCache(max_entries=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # "b" is now the least recently used
+    c.set("c", 3)
+    assert "b" not in c and c.get("a") == 1 and c.get("c") == 3
+    assert c.evictions == 1
+
+def test_byte_budget_evicts_until_it_fits(clock):
+    value = "x" * 1000
+    c = TTLCache(max_entries=100, max_bytes=approx_size(value) * 2)
+    for key in "abc":
+        c.set(key, value)
+    assert len(c) == 2 and "a" not in c
+    assert c.bytes == approx_size(value) * 2
+    # Replacing an entry releases its old size first
+    c.set("c", "small")
+    assert c.bytes == approx_size(value) + approx_size("small")
+
+def test_entries_expire_by_their_own_ttl(clock):
+    c = TTLCache()
+    c.set("short", 1, ttl=10)
+    c.set("long", 2, ttl=60)
+    clock[0] += 30
+    assert c.get("short") is None and c.get("long") == 2
+    c.expire()
+    assert len(c) == 1
+    clock[0] += 30
+    c.expire()
+    assert len(c) == 0 and c.bytes == 0
+    assert c.expirations == 2
+
+def test_refreshed_entry_outlives_its_old_deadline(clock):
+    c = TTLCache()
+    c.set("k", 1, ttl=10)
+    clock[0] += 5
+    c.set("k", 2, ttl=10)
+    clock[0] += 6
+    c.expire()  # the first deadline is due but no longer current
+    assert c.get("k") == 2
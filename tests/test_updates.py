@@ -0,0 +1,43 @@
+import asyncio
+from telegram import Update
+from core.updates import ChatOrderedUpdateProcessor
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+def command(update_id: int, chat_id: int) -> Update:
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": "/stats",
+            "chat": {"id": chat_id, "type": "private"},
+        },
+    }, None)
+
+def test_chats_run_concurrently_and_each_stays_in_order():
+    async def main():
+        processor = ChatOrderedUpdateProcessor(max_concurrent=4)
+        first_started, release_first = asyncio.Event(), asyncio.Event()
+        events = []
+
+        async def handle(name, gate=None):
+            events.append(f"{name} start")
+            if gate:
+                first_started.set()
+                await gate.wait()
+            events.append(f"{name} end")
+
+        a1 = asyncio.create_task(processor.process_update(command(1, 1), handle("a1", release_first)))
+        await first_started.wait()
+        a2 = asyncio.create_task(processor.process_update(command(2, 1), handle("a2")))
+        b1 = asyncio.create_task(processor.process_update(command(3, 2), handle("b1")))
+        # Another chat isn't held up by chat 1's slow update...
+        await b1
+        assert events == ["a1 start", "b1 start", "b1 end"]
+        # ...but chat 1's next update waits for the one before it
+        release_first.set()
+        await asyncio.gather(a1, a2)
+        assert events[3:] == ["a1 end", "a2 start", "a2 end"]
+        assert not processor._chats
+
+    run(main())